@@ -1,7 +1,12 @@
 import time
-from typing import Tuple, List
-from grid import KenKenGrid
+import random
+from typing import Tuple, List, Optional, Dict, Any
+from grid import KenKenGrid, Cell
 from constraints import check_all_constraints_for_cell, cage_satisfied
+from cage_tables import narrow_cage
+from propagation import propagate, popcount
+from stats import failure_kind
+from model import CompiledModel, compile_model
 
 def find_empty_cell(grid_mat):
     n = len(grid_mat)
@@ -11,7 +16,10 @@ def find_empty_cell(grid_mat):
                 return (r,c)
     return None
 
-def solve_backtracking(grid_obj: KenKenGrid, max_solutions: int = 1) -> Tuple[bool, float, int]:
+def solve_backtracking(grid_obj: KenKenGrid, max_solutions: int = 1, cancel=None,
+                       stats=None, progress=None) -> Tuple[bool, float, int]:
+    # stats: optional stats.SearchStats, filled in when given
+    # progress: optional progress(nodes, depth), called every 256 nodes
 
     start = time.time()
     grid = grid_obj.grid
@@ -20,13 +28,18 @@ def solve_backtracking(grid_obj: KenKenGrid, max_solutions: int = 1) -> Tuple[bo
     iterations = 0
     solved_flag = False
     solutions_found = 0
-    cell_to_cage = {}
-    for cage in cages:
-        for cell in cage['cells']:
-            cell_to_cage[cell] = cage
+    cancelled = False
+    cell_to_cage = grid_obj.cell_to_cage
 
-    def backtrack():
-        nonlocal iterations, solved_flag, solutions_found
+    def backtrack(depth: int):
+        nonlocal iterations, solved_flag, solutions_found, cancelled
+        if iterations % 256 == 0:
+            if progress is not None:
+                progress(iterations, depth)
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+        if cancelled:
+            return True
         pos = find_empty_cell(grid)
         if pos is None:
             # full grid — verify all cages satisfied (safety)
@@ -44,16 +57,505 @@ def solve_backtracking(grid_obj: KenKenGrid, max_solutions: int = 1) -> Tuple[bo
 
         r,c = pos
         iterations += 1
+        if stats is not None:
+            stats.node(depth + 1)
         for val in range(1, n+1):
-            if check_all_constraints_for_cell(grid, cages, r, c, val):
+            if stats is None:
+                ok = check_all_constraints_for_cell(grid, cages, r, c, val, cell_to_cage)
+            else:
+                t0 = time.perf_counter()
+                ok = check_all_constraints_for_cell(grid, cages, r, c, val, cell_to_cage)
+                stats.check_time += time.perf_counter() - t0
+                if not ok:
+                    stats.fail(failure_kind(grid, cell_to_cage, r, c, val))
+            if ok:
                 grid[r][c] = val
-                cont = backtrack()
-                if cont and solutions_found >= max_solutions:
+                cont = backtrack(depth + 1)
+                if cont and (solutions_found >= max_solutions or cancelled):
                     return True
                 # backtrack
                 grid[r][c] = 0
+                if stats is not None:
+                    stats.backtrack(depth + 1)
         return False
 
-    backtrack()
+    backtrack(0)
     end = time.time()
+    if stats is not None:
+        stats.total_time += end - start
     return (solved_flag, end-start, iterations)
+
+
+def mask_values(mask: int) -> List[int]:
+    # values 1..N encoded as bit (v-1)
+    vals = []
+    v = 1
+    while mask:
+        if mask & 1:
+            vals.append(v)
+        mask >>= 1
+        v += 1
+    return vals
+
+class CageAggregates:
+    """Running sum, product, filled count and min/max per cage.
+
+    Updated on place and undo so that a candidate value can be tested against
+    its cage in O(1), including bounds on what the remaining cells can reach.
+    The test itself is the cage's compiled feasibility function (model.py).
+    """
+
+    def __init__(self, model: CompiledModel):
+        n = self.n = model.n
+        cages = model.cages
+        k = len(cages)
+        self.ops = [cage.op for cage in cages]
+        self.targets = [cage.target for cage in cages]
+        self.sizes = [cage.size for cage in cages]
+        self.checks = [cage.feasible for cage in cages]
+        self.tables = [cage.table for cage in cages]
+        self.sums = [0] * k
+        self.prods = [1] * k
+        self.filled = [0] * k
+        self.mins = [n + 1] * k
+        self.maxs = [0] * k
+        self.history: List[Tuple[int, int]] = []  # (old min, old max) per add
+
+    def feasible(self, k: int, val: int) -> bool:
+        return self.checks[k](self, k, val)
+
+    def add(self, k: int, val: int):
+        self.history.append((self.mins[k], self.maxs[k]))
+        self.sums[k] += val
+        self.prods[k] *= val
+        self.filled[k] += 1
+        if val < self.mins[k]:
+            self.mins[k] = val
+        if val > self.maxs[k]:
+            self.maxs[k] = val
+
+    def remove(self, k: int, val: int):
+        self.mins[k], self.maxs[k] = self.history.pop()
+        self.sums[k] -= val
+        self.prods[k] //= val
+        self.filled[k] -= 1
+
+class BitmaskSearch:
+    """Backtracking over per-cell candidate bitmasks with MRV cell ordering.
+
+    Row/column usage is tracked in masks, peers are forward-checked on every
+    placement and every domain change is pushed on an undo trail, so
+    backtracking restores state without rescanning the grid.
+    """
+
+    CHECK_EVERY = 256
+
+    def __init__(self, grid_obj: KenKenGrid, max_solutions: int = 1, use_propagation: bool = False,
+                 collect: bool = False, value_order: str = 'ascending', seed: Optional[int] = None,
+                 time_limit: Optional[float] = None, node_limit: Optional[int] = None, cancel=None,
+                 progress=None, stats=None, model: Optional[CompiledModel] = None):
+        if value_order not in ('ascending', 'descending', 'random'):
+            raise ValueError("value_order must be 'ascending', 'descending' or 'random'")
+        self.grid_obj = grid_obj
+        self.grid = grid_obj.grid
+        self.n = grid_obj.n
+        self.cages = grid_obj.get_cages()
+        self.max_solutions = max_solutions
+        self.use_propagation = use_propagation
+        self.value_order = value_order
+        self.rng = random.Random(seed)
+        self.full = (1 << self.n) - 1
+        self.row_used = [0] * self.n
+        self.col_used = [0] * self.n
+        self.domains = [[self.full] * self.n for _ in range(self.n)]
+        self.trail: List[Tuple[int, int, int]] = []  # (r, c, previous mask)
+        # compiled once per puzzle; pass `model` to share one across engines
+        self.model = compile_model(grid_obj) if model is None else model
+        self.cage_of = self.model.cell_cage  # flat cell index -> cage index or -1
+        # ordered cage fillings from the shared combination tables
+        self.fillings = [cage.fillings for cage in self.model.cages]
+        self.totals = CageAggregates(self.model)
+        self.iterations = 0
+        self.solutions_found = 0
+        self.pruned = 0  # values removed by propagation
+        self.solutions: Optional[List[List[List[int]]]] = [] if collect else None
+        self.stack: List[list] = []
+        # limits: wall-clock seconds per run()/resume(), total node budget, and a
+        # cancellation token (anything with is_set(), e.g. threading.Event)
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.cancel = cancel
+        # progress(nodes, depth), called every CHECK_EVERY nodes
+        self.progress = progress
+        self.deadline: Optional[float] = None
+        self.status = 'ready'
+        self.open_pending = False
+        # optional stats.SearchStats; every use is behind a None test
+        self.stats = stats
+        self.fail_kind = ''  # constraint behind the last failed place()
+        # optional observer used by the parallel search: hook.on_node(engine) -> abort?,
+        # hook.donate(engine, r, c, values) -> whether the values were handed off
+        self.hook = None
+
+    def init_domains(self, domains: Optional[List[List[int]]] = None) -> bool:
+        n = self.n
+        for r in range(n):
+            for c in range(n):
+                v = self.grid[r][c]
+                if v == 0:
+                    continue
+                bit = 1 << (v - 1)
+                if (self.row_used[r] | self.col_used[c]) & bit:
+                    return False
+                self.row_used[r] |= bit
+                self.col_used[c] |= bit
+                k = self.cage_of[r * n + c]
+                if k >= 0:
+                    if not self.totals.feasible(k, v):
+                        return False
+                    self.totals.add(k, v)
+        for r in range(n):
+            for c in range(n):
+                v = self.grid[r][c]
+                if v == 0:
+                    self.domains[r][c] = self.full & ~(self.row_used[r] | self.col_used[c])
+                else:
+                    self.domains[r][c] = 1 << (v - 1)
+        if domains is not None:
+            # resume from a snapshot (e.g. a subproblem handed over by another worker)
+            for r in range(n):
+                for c in range(n):
+                    self.domains[r][c] &= domains[r][c]
+        for k in range(len(self.model.cages)):
+            if not self.narrow(k):
+                return False
+        return self.propagate()
+
+    def select_cell(self) -> Optional[Cell]:
+        # MRV: empty cell with the fewest remaining candidates
+        best = None
+        best_count = self.n + 1
+        for r in range(self.n):
+            row = self.grid[r]
+            doms = self.domains[r]
+            for c in range(self.n):
+                if row[c] == 0:
+                    k = popcount(doms[c])
+                    if k < best_count:
+                        best, best_count = (r, c), k
+                        if k <= 1:
+                            return best
+        return best
+
+    def narrow(self, k: int) -> bool:
+        # keep only values that appear in a filling compatible with the cage's domains
+        cage = self.model.cages[k]
+        cells = cage.coords
+        masks = [self.domains[r][c] for (r, c) in cells]
+        support = narrow_cage(cage.fillings, masks)
+        for (r, c), mask, keep in zip(cells, masks, support):
+            if keep != mask:
+                self.restrict(r, c, keep)
+            if keep == 0:
+                return False
+        return True
+
+    def restrict(self, r: int, c: int, mask: int):
+        self.trail.append((r, c, self.domains[r][c]))
+        self.domains[r][c] = mask
+
+    def propagate(self, mark: Optional[int] = None) -> bool:
+        # maintain arc consistency (MAC) when enabled; only constraints over
+        # cells changed since trail position `mark` are revised (None = all)
+        if not self.use_propagation:
+            return True
+        changed = None if mark is None else {(r, c) for r, c, _ in self.trail[mark:]}
+        ok, pruned = propagate(self.grid_obj, self.domains, self.restrict, self.fillings,
+                               changed, self.cage_of)
+        self.pruned += pruned
+        if self.stats is not None:
+            self.stats.prune(pruned)
+        if not ok:
+            self.fail_kind = 'propagation'
+        return ok
+
+    def place(self, r: int, c: int, val: int) -> bool:
+        # assign and forward-check row/column peers; False on a domain wipeout
+        bit = 1 << (val - 1)
+        mark = len(self.trail)
+        self.grid[r][c] = val
+        self.row_used[r] |= bit
+        self.col_used[c] |= bit
+        self.restrict(r, c, bit)
+        ok = True
+        for j in range(self.n):
+            if j != c and self.grid[r][j] == 0 and self.domains[r][j] & bit:
+                self.restrict(r, j, self.domains[r][j] & ~bit)
+                if self.domains[r][j] == 0:
+                    ok = False
+                    self.fail_kind = 'row'
+        for i in range(self.n):
+            if i != r and self.grid[i][c] == 0 and self.domains[i][c] & bit:
+                self.restrict(i, c, self.domains[i][c] & ~bit)
+                if self.domains[i][c] == 0:
+                    ok = False
+                    self.fail_kind = 'column'
+        # forward-check the rest of the cage against the new partial filling
+        k = self.cage_of[r * self.n + c]
+        if ok and k >= 0:
+            ok = self.narrow(k)
+            if not ok:
+                self.fail_kind = 'cage' + self.totals.ops[k]
+        return ok and self.propagate(mark)
+
+    def unplace(self, r: int, c: int, val: int, mark: int):
+        bit = 1 << (val - 1)
+        self.grid[r][c] = 0
+        self.row_used[r] &= ~bit
+        self.col_used[c] &= ~bit
+        trail = self.trail
+        while len(trail) > mark:
+            rr, cc, old = trail.pop()
+            self.domains[rr][cc] = old
+
+    def limit_reached(self) -> Optional[str]:
+        # polled every CHECK_EVERY nodes so the limits cost next to nothing
+        if self.node_limit is not None and self.iterations >= self.node_limit:
+            return 'node_limit'
+        if self.iterations % self.CHECK_EVERY:
+            return None
+        if self.progress is not None:
+            self.progress(self.iterations, len(self.stack))
+        if self.cancel is not None and self.cancel.is_set():
+            return 'cancelled'
+        if self.deadline is not None and time.time() >= self.deadline:
+            return 'timeout'
+        return None
+
+    def search(self) -> bool:
+        """Depth-first search with an explicit stack.
+
+        Returns True when the search stopped early (enough solutions, a limit
+        or cancellation; see self.status) and False once the tree is
+        exhausted. After a stop the stack is kept, so calling search() again
+        resumes where it left off.
+        """
+        stack = self.stack
+        totals = self.totals
+        checks = totals.checks
+        hook = self.hook
+        stats = self.stats
+        descend = not stack or self.open_pending
+        self.open_pending = False
+        while True:
+            if descend:
+                descend = False
+                pos = self.select_cell()
+                if pos is None:
+                    # full grid — verify all cages satisfied (safety)
+                    if all(cage_satisfied([self.grid[r][c] for (r, c) in cage.coords], cage.target, cage.op)
+                           for cage in self.model.cages):
+                        self.solutions_found += 1
+                        if self.solutions is not None:
+                            self.solutions.append([row[:] for row in self.grid])
+                        if self.solutions_found >= self.max_solutions:
+                            self.status = 'solved'
+                            return True
+                else:
+                    stopped = self.limit_reached()
+                    if stopped is not None:
+                        # this node is opened first on resume
+                        self.status = stopped
+                        self.open_pending = True
+                        return True
+                    if hook is not None and hook.on_node(self):
+                        self.status = 'aborted'
+                        self.open_pending = True
+                        return True
+                    r, c = pos
+                    self.iterations += 1
+                    k = self.cage_of[r * self.n + c]
+                    values = mask_values(self.domains[r][c])
+                    if self.value_order == 'descending':
+                        values.reverse()
+                    elif self.value_order == 'random':
+                        self.rng.shuffle(values)
+                    # frame: [r, c, cage index, values, next index, trail mark, placed value]
+                    stack.append([r, c, k, values, 0, 0, 0])
+                    if stats is not None:
+                        stats.node(len(stack))
+            if not stack:
+                self.status = 'exhausted'
+                return False
+            frame = stack[-1]
+            r, c, k, values, i, mark, placed = frame
+            if placed:
+                self.unplace(r, c, placed, mark)
+                if k >= 0:
+                    totals.remove(k, placed)
+                frame[6] = 0
+                if stats is not None:
+                    stats.backtrack(len(stack))
+            while i < len(values):
+                val = values[i]
+                i += 1
+                if hook is not None and i < len(values) and hook.donate(self, r, c, values[i:]):
+                    values = frame[3] = values[:i]
+                if stats is not None:
+                    t0 = time.perf_counter()
+                # O(1) rejection from the cage's running aggregates
+                if k >= 0 and not checks[k](totals, k, val):
+                    if stats is not None:
+                        stats.check_time += time.perf_counter() - t0
+                        stats.fail('cage' + totals.ops[k])
+                    continue
+                mark = len(self.trail)
+                if k >= 0:
+                    totals.add(k, val)
+                ok = self.place(r, c, val)
+                if stats is not None:
+                    stats.check_time += time.perf_counter() - t0
+                    if not ok:
+                        stats.fail(self.fail_kind)
+                if ok:
+                    frame[4], frame[5], frame[6] = i, mark, val
+                    descend = True
+                    break
+                self.unplace(r, c, val, mark)
+                if k >= 0:
+                    totals.remove(k, val)
+            else:
+                stack.pop()
+
+    def snapshot(self) -> Tuple[List[List[int]], List[List[int]]]:
+        return [row[:] for row in self.grid], [row[:] for row in self.domains]
+
+    def split(self, depth: int) -> List[Tuple[List[List[int]], List[List[int]]]]:
+        # expand the search tree `depth` levels and return the open nodes as
+        # independent (grid, domains) subproblems; call after init_domains()
+        tasks = []
+
+        def expand(d: int):
+            pos = self.select_cell()
+            if pos is None or d >= depth:
+                tasks.append(self.snapshot())
+                return
+            r, c = pos
+            self.iterations += 1
+            k = self.cage_of[r * self.n + c]
+            for val in mask_values(self.domains[r][c]):
+                if k >= 0 and not self.totals.feasible(k, val):
+                    continue
+                mark = len(self.trail)
+                if k >= 0:
+                    self.totals.add(k, val)
+                if self.place(r, c, val):
+                    expand(d + 1)
+                self.unplace(r, c, val, mark)
+                if k >= 0:
+                    self.totals.remove(k, val)
+
+        expand(0)
+        return tasks
+
+    def run(self, domains: Optional[List[List[int]]] = None) -> bool:
+        start = time.time()
+        ok = self.init_domains(domains)
+        if self.stats is not None:
+            self.stats.total_time += time.time() - start
+        if not ok:
+            self.status = 'exhausted'
+            return False
+        return self.resume()
+
+    def resume(self) -> bool:
+        # continue (or start) the search under the current limits
+        start = time.time()
+        self.deadline = None if self.time_limit is None else start + self.time_limit
+        self.search()
+        if self.stats is not None:
+            self.stats.total_time += time.time() - start
+        return self.solutions_found > 0
+
+    def save_state(self) -> Dict[str, Any]:
+        """JSON-serializable search state, for checkpointing or moving a job to another worker."""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            'grid': [row[:] for row in self.grid],
+            'domains': [row[:] for row in self.domains],
+            'trail': [list(entry) for entry in self.trail],
+            'stack': [[r, c, k, list(values), i, mark, placed] for (r, c, k, values, i, mark, placed) in self.stack],
+            'iterations': self.iterations,
+            'solutions_found': self.solutions_found,
+            'solutions': self.solutions,
+            'pruned': self.pruned,
+            'status': self.status,
+            'open_pending': self.open_pending,
+            'max_solutions': self.max_solutions,
+            'use_propagation': self.use_propagation,
+            'value_order': self.value_order,
+            'rng': [version, list(internal), gauss],
+        }
+
+    @classmethod
+    def from_state(cls, grid_obj: KenKenGrid, state: Dict[str, Any], **limits) -> 'BitmaskSearch':
+        """Rebuild an engine from save_state() on a grid with the same cages; call resume() next."""
+        grid_obj.from_matrix(state['grid'])
+        engine = cls(grid_obj, state['max_solutions'], use_propagation=state['use_propagation'],
+                     value_order=state['value_order'], **limits)
+        engine.load_state(state)
+        return engine
+
+    def load_state(self, state: Dict[str, Any]):
+        n = self.n
+        self.domains = [row[:] for row in state['domains']]
+        self.trail = [tuple(entry) for entry in state['trail']]
+        self.stack = [list(frame) for frame in state['stack']]
+        self.iterations = state['iterations']
+        self.solutions_found = state['solutions_found']
+        self.solutions = state['solutions']
+        self.pruned = state['pruned']
+        self.status = state['status']
+        self.open_pending = state['open_pending']
+        version, internal, gauss = state['rng']
+        self.rng.setstate((version, tuple(internal), gauss))
+        # row/column masks come straight from the grid; cage aggregates are
+        # replayed givens first, then in stack order, so undo pops line up
+        placed = {(frame[0], frame[1]) for frame in self.stack if frame[6]}
+        order = [(r, c) for r in range(n) for c in range(n) if self.grid[r][c] and (r, c) not in placed]
+        order += [(frame[0], frame[1]) for frame in self.stack if frame[6]]
+        for (r, c) in order:
+            v = self.grid[r][c]
+            bit = 1 << (v - 1)
+            self.row_used[r] |= bit
+            self.col_used[c] |= bit
+            k = self.cage_of[r * n + c]
+            if k >= 0:
+                self.totals.add(k, v)
+
+def solve_backtracking_mrv(grid_obj: KenKenGrid, max_solutions: int = 1, propagate: bool = False,
+                           value_order: str = 'ascending', seed: Optional[int] = None,
+                           timeout_seconds: Optional[float] = None, node_limit: Optional[int] = None,
+                           cancel=None, progress=None, stats=None) -> Tuple[bool, float, int]:
+
+    start = time.time()
+    engine = BitmaskSearch(grid_obj, max_solutions, use_propagation=propagate,
+                           value_order=value_order, seed=seed,
+                           time_limit=timeout_seconds, node_limit=node_limit, cancel=cancel,
+                           progress=progress, stats=stats)
+    solved_flag = engine.run()
+    end = time.time()
+    return (solved_flag, end-start, engine.iterations)
+
+def count_solutions(grid_obj: KenKenGrid, limit: int = 2, collect: bool = False) -> Tuple[int, List[List[List[int]]]]:
+    """Count solutions up to `limit` (2 is enough for a uniqueness check).
+
+    Runs the MRV engine with full propagation on a copy, so `grid_obj` is left
+    untouched. Returns (count, solutions); solutions is empty unless `collect`.
+    """
+    engine = BitmaskSearch(grid_obj.copy(), max(1, limit), use_propagation=True, collect=collect)
+    engine.run()
+    return engine.solutions_found, engine.solutions or []
+
+def has_unique_solution(grid_obj: KenKenGrid) -> bool:
+    return count_solutions(grid_obj, limit=2)[0] == 1
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Iterator, Optional, TextIO
+from grid import KenKenGrid
+from portfolio import run_strategy
+from cache import SolutionCache, fingerprint
+
+# Headless batch solving.
+#
+# Input: one JSON puzzle per line, e.g.
+#   {"id": "p1", "n": 4, "cages": [{"cells": [[0,0],[0,1]], "op": "+", "target": 5}, "0,2,0,3;*;6", ...]}
+# ("algorithm" may be given per line to override --algorithm.)
+# Output: one JSON line per puzzle, written as soon as it is available:
+#   {"id": "p1", "status": "solved", "solution": [[...]], "time": 0.004, "iterations": 16}
+# (status is "solved", "unsolved", "timeout" or "error")
+
+ALGORITHMS = {
+    'backtracking': ('backtracking', {}),
+    'mrv': ('mrv', {}),
+    'mac': ('mrv', {'propagate': True}),
+    'dlx': ('dlx', {}),
+    'cultural': ('cultural', {}),
+    'cultural-hybrid': ('cultural', {'hybrid': True}),
+}
+
+def solve_record(index: int, line: str, algorithm: str, timeout_seconds: float) -> Dict[str, Any]:
+    result: Dict[str, Any] = {'id': index, 'status': 'error', 'solution': None, 'time': 0.0, 'iterations': 0}
+    start = time.time()
+    try:
+        record = json.loads(line)
+        result['id'] = record.get('id', index)
+        name = record.get('algorithm', algorithm)
+        if name not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {name!r}")
+        grid_obj = KenKenGrid.from_dict(record)
+        engine, options = ALGORITHMS[name]
+        # every engine gets the budget: the MRV engines through their own time
+        # limit, backtracking and DLX through this cancel token
+        cancel = threading.Event()
+        timer = threading.Timer(timeout_seconds, cancel.set)
+        timer.daemon = True
+        timer.start()
+        try:
+            solved, matrix, iters = run_strategy(engine, options, grid_obj, timeout_seconds, cancel)
+        finally:
+            timer.cancel()
+        if solved:
+            result['status'] = 'solved'
+        elif cancel.is_set() or time.time() - start >= timeout_seconds:
+            result['status'] = 'timeout'
+        else:
+            result['status'] = 'unsolved'
+        result['solution'] = matrix
+        result['iterations'] = iters
+    except Exception as e:
+        result['error'] = str(e)
+    result['time'] = time.time() - start
+    return result
+
+def read_puzzles(stream: TextIO) -> Iterator[str]:
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+def cache_lookup(cache: SolutionCache, index: int, line: str):
+    # (result for a cache hit or None, (key, symmetry) to store a new solution under)
+    try:
+        record = json.loads(line)
+        grid_obj = KenKenGrid.from_dict(record)
+    except Exception:
+        return None, None  # let the worker report the error
+    start = time.time()
+    key, t = fingerprint(grid_obj)
+    solution = cache.lookup(key, t, grid_obj.n)
+    if solution is None:
+        return None, (key, t)
+    return {'id': record.get('id', index), 'status': 'solved', 'solution': solution,
+            'time': time.time() - start, 'iterations': 0, 'cached': True}, None
+
+def run_batch(lines: Iterator[str], out: TextIO, algorithm: str = 'mac', workers: Optional[int] = None,
+              ordered: bool = False, max_pending: Optional[int] = None, timeout_seconds: float = 5.0,
+              cache: Optional[SolutionCache] = None) -> Dict[str, int]:
+    """Solve puzzles from `lines` across a process pool, writing one result line each to `out`.
+
+    At most `max_pending` puzzles are in flight (or, with `ordered`, waiting
+    to be written in input order), so memory stays bounded however long the
+    input is. With a `cache`, hits are answered without a worker and new
+    solutions are stored. Returns a count per status.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    max_pending = max(workers, max_pending or 4 * workers)
+    counts: Dict[str, int] = {}
+    done: Dict[int, Dict[str, Any]] = {}  # finished but not yet written (ordered mode)
+    keys: Dict[int, Any] = {}  # cache key per puzzle in flight
+    next_out = 0
+
+    def emit(result: Dict[str, Any]):
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+
+    def finish(i: int, result: Dict[str, Any]):
+        nonlocal next_out
+        if not ordered:
+            emit(result)
+            return
+        done[i] = result
+        while next_out in done:
+            emit(done.pop(next_out))
+            next_out += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        index = 0
+        exhausted = False
+        while futures or not exhausted:
+            while not exhausted and len(futures) + len(done) < max_pending:
+                line = next(lines, None)
+                if line is None:
+                    exhausted = True
+                    break
+                key = None
+                if cache is not None:
+                    hit, key = cache_lookup(cache, index, line)
+                    if hit is not None:
+                        finish(index, hit)
+                        index += 1
+                        continue
+                futures[pool.submit(solve_record, index, line, algorithm, timeout_seconds)] = index
+                if key is not None:
+                    keys[index] = key
+                index += 1
+            if not futures:
+                if exhausted:
+                    break
+                continue
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = futures.pop(future)
+                result = future.result()
+                key = keys.pop(i, None)
+                if key is not None and result['status'] == 'solved':
+                    cache.store(*key, result['solution'])
+                finish(i, result)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve KenKen puzzles from JSONL without the GUI.")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL file of puzzles ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file for results ('-' for stdout)")
+    parser.add_argument('-a', '--algorithm', default='mac', choices=sorted(ALGORITHMS))
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--ordered', action='store_true', help="write results in input order")
+    parser.add_argument('--max-pending', type=int, default=None, help="puzzles in flight at once")
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help="time budget per puzzle in seconds, for every algorithm (status 'timeout' when exceeded)")
+    parser.add_argument('--cache', default=None, help="sqlite file caching solutions across runs")
+    parser.add_argument('--cache-size', type=int, default=100000, help="solutions kept in the cache file")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    cache = None if args.cache is None else SolutionCache(path=args.cache, disk_entries=args.cache_size)
+    try:
+        counts = run_batch(read_puzzles(src), dst, args.algorithm, args.workers,
+                           args.ordered, args.max_pending, args.timeout, cache)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+        if cache is not None:
+            cache.close()
+    print(", ".join(f"{k}: {v}" for k, v in sorted(counts.items())) or "no puzzles", file=sys.stderr)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
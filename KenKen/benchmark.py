@@ -0,0 +1,297 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Dict, Any, Optional, Tuple
+from grid import KenKenGrid
+from constraints import cage_satisfied
+from generator import generate_puzzle
+from cache import fingerprint
+from portfolio import run_strategy
+
+# Reproducible benchmark harness.
+#
+# A corpus of generated puzzles (grouped by size and rated difficulty) is solved by
+# each engine; per run we record wall time, nodes (search engines) or
+# generations (Cultural), peak traced memory (from a separate traced run, so
+# tracemalloc does not slow the timed one) and whether a valid solution
+# came back. Results are written as JSON and can be compared against a
+# stored baseline run, flagging per-group regressions beyond a threshold.
+#
+# Groups come from the generator's difficulty rating, which depends on the
+# search engine, so a regenerated corpus can shift puzzles between groups.
+# Save it once (--save-corpus) and reuse it (--corpus) for comparable runs;
+# every record carries the puzzle's seed and fingerprint, and compare() skips
+# groups whose puzzle sets differ from the baseline's.
+
+SIZES = range(4, 10)
+# rated difficulty -> (min, max) cage size that produces it most often
+DIFFICULTIES = {'easy': (1, 3), 'medium': (2, 4), 'hard': (2, 5)}
+
+ENGINES: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    'backtracking': ('backtracking', {}),
+    'mrv': ('mrv', {}),
+    'mac': ('mrv', {'propagate': True}),
+    'dlx': ('dlx', {}),
+    'cultural': ('cultural', {}),
+    'cultural-hybrid': ('cultural', {'hybrid': True}),
+}
+DEFAULT_ENGINES = ['backtracking', 'mrv', 'mac', 'dlx', 'cultural', 'cultural-hybrid']
+
+# metric -> smaller is better; success_rate is handled separately
+COMPARED = ('median_time', 'mean_nodes', 'mean_generations', 'peak_memory')
+
+def build_corpus(sizes=SIZES, difficulties=None, per_group: int = 3, seed: int = 0,
+                 max_attempts: int = 50) -> List[Dict[str, Any]]:
+    """Generated unique-solution puzzles, `per_group` per size and rated difficulty.
+
+    Seeds are tried in order until a group is full (or `max_attempts` per
+    puzzle run out, e.g. 'hard' 4x4), so a group only depends on (seed, size,
+    difficulty) and is the same however the rest of the corpus is chosen.
+    """
+    difficulties = list(DIFFICULTIES) if difficulties is None else difficulties
+    corpus = []
+    for n in sizes:
+        for d, difficulty in enumerate(difficulties):
+            min_cage, max_cage = DIFFICULTIES[difficulty]
+            base = seed * 1000003 + n * 10007 + d * 101
+            found = 0
+            for attempt in range(max_attempts * per_group):
+                if found >= per_group:
+                    break
+                grid_obj, _, rating = generate_puzzle(n, base + attempt, min_cage, max_cage)
+                if rating['difficulty'] != difficulty:
+                    continue
+                corpus.append({'id': f"{n}x{n}-{difficulty}-{found}", 'n': n, 'difficulty': difficulty,
+                               'seed': base + attempt, 'score': rating['score'],
+                               'fingerprint': fingerprint(grid_obj)[0],
+                               'cages': grid_obj.to_dict()['cages']})
+                found += 1
+    return corpus
+
+def save_corpus(path: str, corpus: List[Dict[str, Any]]):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(corpus, f, indent=1)
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding='utf-8') as f:
+        corpus = json.load(f)
+    for puzzle in corpus:
+        if 'fingerprint' not in puzzle:
+            puzzle['fingerprint'] = fingerprint(KenKenGrid.from_dict(puzzle))[0]
+    return corpus
+
+def verify(grid_obj: KenKenGrid, matrix: Optional[List[List[int]]]) -> bool:
+    if matrix is None:
+        return False
+    n = grid_obj.n
+    full = set(range(1, n + 1))
+    if any(set(row) != full for row in matrix):
+        return False
+    if any({matrix[r][c] for r in range(n)} != full for c in range(n)):
+        return False
+    return all(cage_satisfied([matrix[r][c] for r, c in cage['cells']], cage['target'], cage['op'])
+               for cage in grid_obj.get_cages())
+
+def attempt(kind: str, options: Dict[str, Any], puzzle: Dict[str, Any], timeout_seconds: float,
+            trace_memory: bool) -> Dict[str, Any]:
+    # one solve; peak memory is only traced when asked, so a timed attempt
+    # does not pay tracemalloc's per-allocation overhead
+    grid_obj = KenKenGrid.from_dict(puzzle)
+    cancel = threading.Event()
+    timer = threading.Timer(timeout_seconds, cancel.set)
+    timer.start()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        solved, matrix, iters = run_strategy(kind, options, grid_obj, timeout_seconds, cancel)
+        error = None
+    except Exception as e:
+        solved, matrix, iters, error = False, None, 0, str(e)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    timer.cancel()
+    return {'grid': grid_obj, 'solved': solved, 'matrix': matrix, 'iters': iters, 'error': error,
+            'time': elapsed, 'timed_out': cancel.is_set() or (not solved and elapsed >= timeout_seconds),
+            'peak': peak}
+
+def run_one(engine: str, puzzle: Dict[str, Any], timeout_seconds: float, seed: int,
+            trace_memory: bool = True) -> Dict[str, Any]:
+    """Time one engine on one puzzle; with `trace_memory`, a second, traced run gives peak memory."""
+    kind, options = ENGINES[engine]
+    options = dict(options)
+    if kind == 'cultural':
+        options['seed'] = seed
+    run = attempt(kind, options, puzzle, timeout_seconds, False)
+    peak = attempt(kind, options, puzzle, timeout_seconds, True)['peak'] if trace_memory else 0
+    grid_obj, solved, iters = run['grid'], run['solved'], run['iters']
+    record = {
+        'engine': engine, 'puzzle': puzzle['id'], 'n': puzzle['n'], 'difficulty': puzzle['difficulty'],
+        'seed': puzzle.get('seed'),
+        'fingerprint': puzzle.get('fingerprint') or fingerprint(grid_obj)[0],
+        'success': bool(solved) and verify(grid_obj, run['matrix']),
+        'timed_out': run['timed_out'],
+        'time': run['time'],
+        'nodes': 0 if kind == 'cultural' else iters,
+        'generations': iters if kind == 'cultural' else 0,
+        'peak_memory': peak,
+    }
+    if run['error'] is not None:
+        record['error'] = run['error']
+    return record
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for rec in records:
+        groups.setdefault((rec['engine'], f"{rec['n']}x{rec['n']}-{rec['difficulty']}"), []).append(rec)
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for (engine, group), recs in sorted(groups.items()):
+        summary.setdefault(engine, {})[group] = {
+            'runs': len(recs),
+            'puzzles': sorted({r['fingerprint'] for r in recs}),
+            'success_rate': sum(r['success'] for r in recs) / len(recs),
+            'median_time': statistics.median(r['time'] for r in recs),
+            'mean_nodes': statistics.mean(r['nodes'] for r in recs),
+            'mean_generations': statistics.mean(r['generations'] for r in recs),
+            'peak_memory': max(r['peak_memory'] for r in recs),
+        }
+    return summary
+
+def mismatched_groups(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(engine, group) pairs present in both runs but solved over different puzzle sets.
+
+    Baselines written before fingerprints were recorded count as mismatched,
+    since their puzzles cannot be checked.
+    """
+    out = []
+    for engine, groups in current['summary'].items():
+        for group, cur in groups.items():
+            base = baseline.get('summary', {}).get(engine, {}).get(group)
+            if base is not None and base.get('puzzles') != cur['puzzles']:
+                out.append((engine, group))
+    return out
+
+def run_benchmark(engines: Optional[List[str]] = None, corpus: Optional[List[Dict[str, Any]]] = None,
+                  repeat: int = 1, timeout_seconds: float = 10.0, seed: int = 0,
+                  trace_memory: bool = True, log=None, corpus_file: Optional[str] = None) -> Dict[str, Any]:
+    """Solve every corpus puzzle with every engine `repeat` times; returns the results document."""
+    engines = DEFAULT_ENGINES if engines is None else engines
+    corpus = build_corpus(seed=seed) if corpus is None else corpus
+    records = []
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}")
+        for puzzle in corpus:
+            for k in range(repeat):
+                rec = run_one(engine, puzzle, timeout_seconds, seed + k, trace_memory)
+                records.append(rec)
+                if log is not None:
+                    log(f"{engine:12} {puzzle['id']:16} {'ok ' if rec['success'] else 'FAIL'} "
+                        f"{rec['time']:8.3f}s nodes={rec['nodes']} gens={rec['generations']}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engines': engines,
+            'puzzles': len(corpus),
+            'corpus': corpus_file,
+            'repeat': repeat,
+            'timeout': timeout_seconds,
+            'seed': seed,
+            'trace_memory': trace_memory,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'summary': summarize(records),
+        'results': records,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.1,
+            min_time: float = 0.005, min_memory: int = 64 * 1024) -> List[Dict[str, Any]]:
+    """Regressions of `current` against `baseline`, per engine and group.
+
+    A metric regresses when it grows by more than `threshold` (relative);
+    differences under `min_time` seconds or `min_memory` bytes are treated
+    as noise. Any drop in success rate is a regression. Groups whose puzzle
+    sets differ (see mismatched_groups) are not compared.
+    """
+    regressions = []
+    skip = set(mismatched_groups(current, baseline))
+    for engine, groups in current['summary'].items():
+        for group, cur in groups.items():
+            base = baseline.get('summary', {}).get(engine, {}).get(group)
+            if base is None or (engine, group) in skip:
+                continue
+            if cur['success_rate'] < base['success_rate']:
+                regressions.append({'engine': engine, 'group': group, 'metric': 'success_rate',
+                                    'baseline': base['success_rate'], 'current': cur['success_rate']})
+            for metric in COMPARED:
+                old, new = base.get(metric, 0), cur.get(metric, 0)
+                if metric == 'median_time' and new - old < min_time:
+                    continue
+                if metric == 'peak_memory' and new - old < min_memory:
+                    continue
+                if new > old * (1 + threshold) and new > 0:
+                    regressions.append({'engine': engine, 'group': group, 'metric': metric,
+                                        'baseline': old, 'current': new,
+                                        'change': (new - old) / old if old else float('inf')})
+    return regressions
+
+def parse_sizes(text: str) -> range:
+    lo, _, hi = text.partition('-')
+    return range(int(lo), int(hi or lo) + 1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the KenKen solvers on a seeded puzzle corpus.")
+    parser.add_argument('-o', '--output', default='benchmark.json', help="JSON file for the results")
+    parser.add_argument('-b', '--baseline', default=None, help="earlier results file to compare against")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1, help="relative change counted as a regression")
+    parser.add_argument('-e', '--engines', default=','.join(DEFAULT_ENGINES),
+                        help=f"comma-separated subset of {','.join(ENGINES)}")
+    parser.add_argument('--corpus', default=None, help="load the puzzle corpus from this JSON file instead of generating it")
+    parser.add_argument('--save-corpus', default=None, help="write the corpus used to this JSON file")
+    parser.add_argument('--sizes', default='4-9', help="grid sizes, e.g. 4-9 or 6")
+    parser.add_argument('--difficulties', default=','.join(DIFFICULTIES))
+    parser.add_argument('--per-group', type=int, default=3, help="puzzles per size/difficulty group")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per puzzle and engine")
+    parser.add_argument('--timeout', type=float, default=10.0, help="time budget per run in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip the traced run that measures peak memory (halves the run time)")
+    parser.add_argument('-q', '--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.corpus is not None:
+        corpus = load_corpus(args.corpus)
+    else:
+        corpus = build_corpus(parse_sizes(args.sizes), args.difficulties.split(','), args.per_group, args.seed)
+    if args.save_corpus is not None:
+        save_corpus(args.save_corpus, corpus)
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    results = run_benchmark(args.engines.split(','), corpus, args.repeat, args.timeout, args.seed,
+                            not args.no_memory, log, args.corpus)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    for engine, group in mismatched_groups(results, baseline):
+        print(f"SKIPPED {engine} {group}: puzzle set differs from the baseline (use --corpus)", file=sys.stderr)
+    regressions = compare(results, baseline, args.threshold)
+    for reg in regressions:
+        print(f"REGRESSION {reg['engine']} {reg['group']} {reg['metric']}: "
+              f"{reg['baseline']:.4g} -> {reg['current']:.4g}", file=sys.stderr)
+    print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Tuple, Optional, Dict, Any
+from grid import KenKenGrid, Cell
+from compact import pack_matrix, unpack_matrix
+
+# Solution cache keyed by a canonical puzzle fingerprint.
+#
+# Two puzzles get the same key when one maps onto the other under a symmetry
+# of the square (the 8 rotations/reflections, transposition included) and
+# cage list order. Other row/column permutations are not canonicalized:
+# finding the canonical form under all N!^2 of them is a graph-isomorphism
+# style search, and the permutations that keep every cage connected are, on
+# almost every real puzzle, already in that group (identity and reversal).
+#
+# Solutions are stored in the canonical orientation and mapped back through
+# the inverse symmetry on a hit. Memory holds an LRU of recent entries; an
+# optional sqlite file behind it keeps up to `disk_entries` solutions, evicting
+# the least recently used (it may run over by up to `commit_every` rows between
+# commits). Disk writes, i.e. new solutions and the `used` stamps of hits, are
+# committed in batches of `commit_every`, at most `commit_seconds` apart, and
+# on flush()/close(). The file runs in WAL mode with synchronous=NORMAL, so a
+# commit does not wait for an fsync.
+
+Transform = int  # index into the dihedral group, 0 = identity
+
+def transform_cell(t: Transform, r: int, c: int, n: int) -> Cell:
+    m = n - 1
+    if t >= 4:  # reflections: transpose first
+        r, c = c, r
+    for _ in range(t % 4):  # quarter turns clockwise
+        r, c = c, m - r
+    return r, c
+
+def transform_matrix(t: Transform, mat: List[List[int]]) -> List[List[int]]:
+    n = len(mat)
+    out = [[0] * n for _ in range(n)]
+    for r in range(n):
+        for c in range(n):
+            rr, cc = transform_cell(t, r, c, n)
+            out[rr][cc] = mat[r][c]
+    return out
+
+def inverse_matrix(t: Transform, mat: List[List[int]]) -> List[List[int]]:
+    # undo transform_matrix(t, ...)
+    n = len(mat)
+    out = [[0] * n for _ in range(n)]
+    for r in range(n):
+        for c in range(n):
+            rr, cc = transform_cell(t, r, c, n)
+            out[r][c] = mat[rr][cc]
+    return out
+
+@lru_cache(maxsize=None)
+def cell_maps(n: int) -> Tuple[Dict[Cell, int], ...]:
+    # per symmetry: cell -> flat index of its image, built once per N
+    return tuple({(r, c): rr * n + cc for r in range(n) for c in range(n)
+                  for rr, cc in [transform_cell(t, r, c, n)]} for t in range(8))
+
+def canonical_form(grid_obj: KenKenGrid) -> Tuple[tuple, Transform]:
+    """Smallest encoding of the puzzle over all 8 symmetries, and the symmetry that gives it."""
+    n = grid_obj.n
+    cages = [(cage['cells'], cage['op'], cage['target']) for cage in grid_obj.get_cages()]
+    givens = grid_obj.grid if any(any(row) for row in grid_obj.grid) else None
+    best = None
+    best_t = 0
+    for t, image in enumerate(cell_maps(n)):
+        form = tuple(sorted((tuple(sorted(image[cell] for cell in cells)), op, target)
+                            for cells, op, target in cages))
+        if givens is not None:
+            form += (pack_matrix(transform_matrix(t, givens)),)
+        if best is None or form < best:
+            best, best_t = form, t
+    return (n,) + best, best_t
+
+def fingerprint(grid_obj: KenKenGrid) -> Tuple[str, Transform]:
+    """(stable hash of the canonical form, symmetry mapping the puzzle onto it)."""
+    form, t = canonical_form(grid_obj)
+    return hashlib.sha256(repr(form).encode()).hexdigest(), t
+
+class SolutionCache:
+    def __init__(self, capacity: int = 1024, path: Optional[str] = None, disk_entries: int = 100000,
+                 commit_every: int = 256, commit_seconds: float = 1.0):
+        self.capacity = max(1, capacity)
+        self.memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.disk_entries = disk_entries
+        self.commit_every = max(1, commit_every)
+        self.commit_seconds = commit_seconds
+        self.db = None
+        self.disk_count = 0  # rows in the file, kept here instead of COUNT(*) per insert
+        self.touched: Dict[str, float] = {}  # disk hits whose `used` stamp is not written yet
+        self.pending = 0  # writes since the last commit
+        self.last_commit = time.time()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                            "(key TEXT PRIMARY KEY, n INTEGER, solution BLOB, used REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS solutions_used ON solutions(used)")
+            self.db.commit()
+            self.disk_count = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def lookup(self, key: str, t: Transform, n: int) -> Optional[List[List[int]]]:
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return inverse_matrix(t, unpack_matrix(data, n))
+        if self.db is not None:
+            row = self.db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                data = bytes(row[0])
+                self.touched[key] = time.time()
+                self.wrote()
+                self.remember(key, data)
+                self.hits += 1
+                self.disk_hits += 1
+                return inverse_matrix(t, unpack_matrix(data, n))
+        self.misses += 1
+        return None
+
+    def store(self, key: str, t: Transform, solution: List[List[int]]):
+        data = pack_matrix(transform_matrix(t, solution))
+        self.remember(key, data)
+        if self.db is None:
+            return
+        now = time.time()
+        if self.db.execute("INSERT OR IGNORE INTO solutions VALUES (?, ?, ?, ?)",
+                           (key, len(solution), data, now)).rowcount:
+            self.disk_count += 1
+        else:
+            self.db.execute("UPDATE solutions SET solution = ?, used = ? WHERE key = ?", (data, now, key))
+        self.touched.pop(key, None)
+        self.wrote()
+
+    def wrote(self):
+        self.pending += 1
+        if self.pending >= self.commit_every or time.time() - self.last_commit >= self.commit_seconds:
+            self.flush()
+
+    def flush(self):
+        # write pending `used` stamps, evict down to disk_entries and commit
+        if self.db is None:
+            return
+        if self.touched:
+            self.db.executemany("UPDATE solutions SET used = ? WHERE key = ?",
+                                [(used, key) for key, used in self.touched.items()])
+            self.touched.clear()
+        if self.disk_count > self.disk_entries:
+            # recount first: another process may share the file
+            self.disk_count = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        excess = self.disk_count - self.disk_entries
+        if excess > 0:
+            self.db.execute("DELETE FROM solutions WHERE key IN "
+                            "(SELECT key FROM solutions ORDER BY used LIMIT ?)", (excess,))
+            self.disk_count -= excess
+        self.db.commit()
+        self.pending = 0
+        self.last_commit = time.time()
+
+    def remember(self, key: str, data: bytes):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def get(self, grid_obj: KenKenGrid) -> Optional[List[List[int]]]:
+        key, t = fingerprint(grid_obj)
+        return self.lookup(key, t, grid_obj.n)
+
+    def put(self, grid_obj: KenKenGrid, solution: List[List[int]]):
+        # grid_obj is the unsolved puzzle (its givens are part of the key)
+        key, t = fingerprint(grid_obj)
+        self.store(key, t, solution)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0, 'memory_entries': len(self.memory)}
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+def cached_solve(cache: SolutionCache, solver, grid_obj: KenKenGrid, *args, **kwargs) -> Tuple[bool, float, int]:
+    """Run `solver(grid_obj, ...)` (any solve_* with the (solved, time, iterations) contract) behind `cache`.
+
+    On a hit the solution is written into grid_obj and no search runs
+    (iterations = 0).
+    """
+    start = time.time()
+    key, t = fingerprint(grid_obj)
+    solution = cache.lookup(key, t, grid_obj.n)
+    if solution is not None:
+        grid_obj.from_matrix(solution)
+        return True, time.time() - start, 0
+    solved, _, iters = solver(grid_obj, *args, **kwargs)
+    if solved:
+        cache.store(key, t, grid_obj.to_matrix())
+    return solved, time.time() - start, iters
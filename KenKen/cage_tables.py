@@ -0,0 +1,111 @@
+from typing import List, Tuple, Dict, Any
+from itertools import combinations_with_replacement
+from functools import lru_cache
+from constraints import cage_satisfied
+
+Cell = Tuple[int, int]
+Cage = Dict[str, Any]
+Filling = Tuple[int, ...]
+
+# Tables are cached per (op, target, size, N) at module level, so they are
+# built once and shared by every solve (and every puzzle in a batch).
+
+@lru_cache(maxsize=None)
+def cage_combinations(op: str, target: int, size: int, n: int) -> Tuple[Filling, ...]:
+    """All value multisets (sorted tuples) of `size` values in 1..n satisfying the cage."""
+    if size <= 0:
+        return ()
+    out = []
+    for combo in combinations_with_replacement(range(1, n + 1), size):
+        if cage_satisfied(list(combo), target, op):
+            out.append(combo)
+    return tuple(out)
+
+def cage_conflicts(cells: List[Cell]) -> Tuple[Tuple[int, int], ...]:
+    # index pairs of cage cells sharing a row or column (must hold distinct values)
+    pairs = []
+    for i in range(len(cells)):
+        for j in range(i + 1, len(cells)):
+            if cells[i][0] == cells[j][0] or cells[i][1] == cells[j][1]:
+                pairs.append((i, j))
+    return tuple(pairs)
+
+@lru_cache(maxsize=None)
+def _fillings(op: str, target: int, size: int, n: int, conflicts: Tuple[Tuple[int, int], ...]) -> Tuple[Filling, ...]:
+    partners: List[List[int]] = [[] for _ in range(size)]
+    for i, j in conflicts:
+        partners[j].append(i)
+    out: List[Filling] = []
+    for combo in cage_combinations(op, target, size, n):
+        counts: Dict[int, int] = {}
+        for v in combo:
+            counts[v] = counts.get(v, 0) + 1
+        current = [0] * size
+
+        def place(pos: int):
+            if pos == size:
+                out.append(tuple(current))
+                return
+            for v in counts:
+                if counts[v] == 0:
+                    continue
+                if any(current[p] == v for p in partners[pos]):
+                    continue
+                counts[v] -= 1
+                current[pos] = v
+                place(pos + 1)
+                counts[v] += 1
+            current[pos] = 0
+
+        place(0)
+    return tuple(out)
+
+def cage_fillings(cage: Cage, n: int) -> Tuple[Filling, ...]:
+    """Ordered fillings aligned with cage['cells'], respecting row/column uniqueness inside the cage."""
+    cells = cage['cells']
+    return _fillings(cage['op'], cage['target'], len(cells), n, cage_conflicts(cells))
+
+# filling table (by identity) -> (table, per-position bitsets); the tables come
+# from the lru caches above, so each is indexed once and kept alive here
+_indexes: Dict[int, Tuple[Tuple[Filling, ...], Tuple[Tuple[int, ...], ...]]] = {}
+
+def filling_index(fillings: Tuple[Filling, ...]) -> Tuple[Tuple[int, ...], ...]:
+    """index[i][v-1]: bitset over filling numbers of the fillings with value v in position i."""
+    entry = _indexes.get(id(fillings))
+    if entry is None or entry[0] is not fillings:
+        size = len(fillings[0]) if fillings else 0
+        top = max((max(f) for f in fillings), default=0)
+        index = [[0] * top for _ in range(size)]
+        for bit, f in enumerate(fillings):
+            for i, v in enumerate(f):
+                index[i][v - 1] |= 1 << bit
+        entry = (fillings, tuple(tuple(row) for row in index))
+        _indexes[id(fillings)] = entry
+    return entry[1]
+
+def narrow_cage(fillings: Tuple[Filling, ...], masks: List[int]) -> List[int]:
+    # masks[i] is the candidate bitmask (bit v-1 for value v) of the i-th cage cell;
+    # returns, per cell, the values that appear in at least one still-possible filling.
+    # The still-possible fillings are found as one bitset with big-int AND/OR
+    # over filling_index(), not by testing the fillings one at a time.
+    size = len(masks)
+    if not fillings:
+        return [0] * size
+    index = filling_index(fillings)
+    alive = (1 << len(fillings)) - 1
+    for mask, by_value in zip(masks, index):
+        allowed = 0
+        for v, bits in enumerate(by_value):
+            if mask >> v & 1:
+                allowed |= bits
+        alive &= allowed
+        if not alive:
+            return [0] * size
+    support = [0] * size
+    for i, by_value in enumerate(index):
+        keep = 0
+        for v, bits in enumerate(by_value):
+            if bits & alive:
+                keep |= 1 << v
+        support[i] = keep
+    return support
@@ -0,0 +1,197 @@
+from array import array
+from typing import List, Tuple, Optional, Dict
+from grid import KenKenGrid, Cage, Cell
+
+# Flat, array-backed puzzle representation.
+#
+# Cells live in one bytearray of N*N values (row-major, 0 = empty), so a
+# snapshot is a single bytes copy and restore is a slice assignment. Cages are
+# compiled into parallel int arrays: cage k covers cage_cells[starts[k]:starts[k+1]]
+# (flat cell indices), with op code ops[k] and target targets[k].
+#
+# CompactGrid is a standalone representation: the solvers accept it, but
+# nothing in the tree builds one on its own. Cultural Algorithm individuals stay
+# row lists, because they are edited in place and carry incremental
+# violation counts. pack_matrix/unpack_matrix are what cache.py uses to
+# store solutions.
+
+OPS = '+-*/='
+OP_CODES = {op: i for i, op in enumerate(OPS)}
+
+class CompactCages:
+    __slots__ = ('cells', 'starts', 'ops', 'targets')
+
+    def __init__(self, n: int, cages: List[dict]):
+        self.cells = array('H')
+        self.starts = array('I', [0])
+        self.ops = bytearray()
+        self.targets = array('q')
+        for cage in cages:
+            self.cells.extend(r * n + c for (r, c) in cage['cells'])
+            self.starts.append(len(self.cells))
+            self.ops.append(OP_CODES[cage['op']])
+            self.targets.append(cage['target'])
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def cage(self, k: int) -> Tuple[array, str, int]:
+        return self.cells[self.starts[k]:self.starts[k + 1]], OPS[self.ops[k]], self.targets[k]
+
+class RowView:
+    """One row of a CompactGrid, indexable like a list."""
+    __slots__ = ('cells', 'base', 'n')
+
+    def __init__(self, cells: bytearray, base: int, n: int):
+        self.cells = cells
+        self.base = base
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, c):
+        if isinstance(c, slice):
+            # slices copy out, like list slicing
+            return list(self.cells[self.base:self.base + self.n][c])
+        if not -self.n <= c < self.n:
+            raise IndexError("Cell out of range")
+        return self.cells[self.base + c % self.n]
+
+    def __setitem__(self, c, value):
+        if isinstance(c, slice):
+            index = range(self.n)[c]
+            values = list(value)
+            if len(values) != len(index):
+                raise ValueError("Slice assignment cannot change the row length")
+            for i, v in zip(index, values):
+                self.cells[self.base + i] = v
+            return
+        if not -self.n <= c < self.n:
+            raise IndexError("Cell out of range")
+        self.cells[self.base + c % self.n] = value
+
+    def __iter__(self):
+        return iter(self.cells[self.base:self.base + self.n])
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+class GridView:
+    """List-of-lists style access (view[r][c]) backed by the flat cell buffer."""
+    __slots__ = ('cells', 'n')
+
+    def __init__(self, cells: bytearray, n: int):
+        self.cells = cells
+        self.n = n
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getitem__(self, r):
+        if isinstance(r, slice):
+            return [RowView(self.cells, i * self.n, self.n) for i in range(self.n)[r]]
+        if not -self.n <= r < self.n:
+            raise IndexError("Row out of range")
+        return RowView(self.cells, (r % self.n) * self.n, self.n)
+
+    def __iter__(self):
+        return (self[r] for r in range(self.n))
+
+class CompactGrid:
+    # Also offers the KenKenGrid surface the solvers read (get_cages, cell_to_cage,
+    # grid, copy, from_matrix), so a CompactGrid can be passed to them directly.
+    __slots__ = ('n', 'cells', 'cages', '_cage_dicts', '_cell_to_cage')
+
+    def __init__(self, n: int, cages: Optional[CompactCages] = None, cells: Optional[bytes] = None):
+        if not 0 < n <= 255:
+            raise ValueError("Grid size must be between 1 and 255")
+        self.n = n
+        self.cells = bytearray(cells) if cells is not None else bytearray(n * n)
+        if len(self.cells) != n * n:
+            raise ValueError("Cell buffer does not match grid size")
+        self.cages = cages if cages is not None else CompactCages(n, [])
+        self._cage_dicts = None
+        self._cell_to_cage = None
+
+    @classmethod
+    def from_grid(cls, grid_obj: KenKenGrid) -> 'CompactGrid':
+        out = cls(grid_obj.n, CompactCages(grid_obj.n, grid_obj.get_cages()))
+        out.from_matrix(grid_obj.grid)
+        return out
+
+    def to_grid(self) -> KenKenGrid:
+        out = KenKenGrid(self.n)
+        out.from_matrix(self.to_matrix())
+        for k in range(len(self.cages)):
+            cells, op, target = self.cages.cage(k)
+            out.add_cage([divmod(i, self.n) for i in cells], op, target)
+        return out
+
+    def get_cages(self) -> List[Cage]:
+        # decoded once; the compiled cages never change after construction
+        if self._cage_dicts is None:
+            n = self.n
+            self._cage_dicts = []
+            for k in range(len(self.cages)):
+                cells, op, target = self.cages.cage(k)
+                self._cage_dicts.append({'cells': [divmod(i, n) for i in cells], 'op': op, 'target': target})
+        return self._cage_dicts
+
+    @property
+    def cell_to_cage(self) -> Dict[Cell, Cage]:
+        if self._cell_to_cage is None:
+            self._cell_to_cage = {cell: cage for cage in self.get_cages() for cell in cage['cells']}
+        return self._cell_to_cage
+
+    def get_cage_at(self, r: int, c: int) -> Optional[Cage]:
+        return self.cell_to_cage.get((r, c))
+
+    @property
+    def grid(self) -> GridView:
+        return GridView(self.cells, self.n)
+
+    def get_cell(self, r: int, c: int) -> int:
+        return self.cells[r * self.n + c]
+
+    def set_cell(self, r: int, c: int, value: int):
+        if not (0 <= r < self.n and 0 <= c < self.n):
+            raise IndexError("Cell out of range")
+        self.cells[r * self.n + c] = value
+
+    def snapshot(self) -> bytes:
+        return bytes(self.cells)
+
+    def restore(self, snap: bytes):
+        if len(snap) != len(self.cells):
+            raise ValueError("Snapshot does not match grid size")
+        self.cells[:] = snap
+
+    def copy(self) -> 'CompactGrid':
+        # cages are immutable once compiled, so copies share them (and their decoded form)
+        out = CompactGrid(self.n, self.cages, self.cells)
+        out._cage_dicts = self._cage_dicts
+        out._cell_to_cage = self._cell_to_cage
+        return out
+
+    def to_matrix(self) -> List[List[int]]:
+        n = self.n
+        return [list(self.cells[r * n:(r + 1) * n]) for r in range(n)]
+
+    def from_matrix(self, mat: List[List[int]]):
+        if len(mat) != self.n or any(len(row) != self.n for row in mat):
+            raise ValueError("Matrix dimensions do not match grid size")
+        self.cells[:] = bytes(v for row in mat for v in row)
+
+    def is_complete(self) -> bool:
+        return 0 not in self.cells
+
+def pack_matrix(mat: List[List[int]]) -> bytes:
+    # compact storage for grids kept in bulk (populations, archives)
+    return bytes(v for row in mat for v in row)
+
+def unpack_matrix(data: bytes, n: int) -> List[List[int]]:
+    return [list(data[r * n:(r + 1) * n]) for r in range(n)]
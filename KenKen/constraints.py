@@ -1,4 +1,5 @@
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, FrozenSet
+from functools import lru_cache
 from math import prod
 
 Cell = Tuple[int,int]
@@ -16,6 +17,36 @@ def valid_in_row_col(grid: List[List[int]], r: int, c: int, value: int) -> bool:
             return False
     return True
 
+# Lookup tables per (op, target, N), built once and cached. All integer
+# arithmetic: a value is only kept if the cage can still be completed.
+
+@lru_cache(maxsize=None)
+def product_table(target: int, size: int, n: int) -> Tuple[FrozenSet[int], ...]:
+    """reach[j]: divisors of `target` that are a product of exactly j values in 1..n (j < size).
+
+    A partial product p over a cage with j cells left can be completed iff
+    target % p == 0 and target // p is in reach[j].
+    """
+    reach = [frozenset([1])]
+    for _ in range(1, max(1, size)):
+        reach.append(frozenset(q * v for q in reach[-1] for v in range(1, n + 1)
+                               if target % (q * v) == 0))
+    return tuple(reach)
+
+@lru_cache(maxsize=None)
+def pair_partners(op: str, target: int, n: int) -> Tuple[int, ...]:
+    """partners[v]: bitmask (bit w-1) of the values w that complete a '-' or '/' pair with v."""
+    partners = [0] * (n + 1)
+    for v in range(1, n + 1):
+        for w in range(1, n + 1):
+            if op == '-':
+                ok = abs(v - w) == target
+            else:
+                ok = v * target == w or w * target == v
+            if ok:
+                partners[v] |= 1 << (w - 1)
+    return tuple(partners)
+
 def cage_valid_partial(values: List[int], target: int, op: str, N:int) -> bool:
   # values may contain zeros for unfilled cells
     filled = [v for v in values if v != 0]
@@ -33,26 +64,21 @@ def cage_valid_partial(values: List[int], target: int, op: str, N:int) -> bool:
         p = 1
         for v in filled:
             p *= v
-        if p > target:
+        if target <= 0 or target % p != 0:
             return False
-        if p == target and len(filled) < len(values):
+        # the cells left must be able to multiply up to the rest
+        # (p == target with cells left is fine: they can all be 1)
+        return target // p in product_table(target, len(values), N)[len(values) - len(filled)]
+    if op == '-' or op == '/':
+        # pairs only; each filled value needs a partner, two must be partners
+        if len(values) != 2:
             return False
-        return True
-    if op == '-':
-        # subtraction or difference usually for 2 cells: only check when both present
-        if len(filled) == len(values):
-            a,b = filled[0], filled[1]
-            return abs(a-b) == target
-        return True
-    if op == '/':
-        # division usually for 2 cells: check when both present
-        if len(filled) == len(values):
-            a,b = filled[0], filled[1]
-            if b != 0 and a / b == target:
-                return True
-            if a != 0 and b / a == target:
-                return True
+        partners = pair_partners(op, target, N)
+        a = filled[0]
+        if a > N or not partners[a]:
             return False
+        if len(filled) == 2:
+            return (partners[a] >> (filled[1] - 1)) & 1 == 1
         return True
     if op == '=':
         # single-cell cage
@@ -79,17 +105,14 @@ def cage_satisfied(values: List[int], target: int, op: str) -> bool:
         if len(values) != 2:
             return False
         a,b = values
-        # check integer division target (but allow floats)
-        if b != 0 and a / b == target:
-            return True
-        if a != 0 and b / a == target:
-            return True
-        return False
+        # integer arithmetic: a / b == target without floats
+        return a == b * target or b == a * target
     if op == '=':
         return values[0] == target
     return False
 
-def check_all_constraints_for_cell(grid: List[List[int]], cages: List[Cage], r: int, c: int, value: int) -> bool:
+def check_all_constraints_for_cell(grid: List[List[int]], cages: List[Cage], r: int, c: int, value: int,
+                                   cell_to_cage: Optional[Dict[Cell, Cage]] = None) -> bool:
    
     n = len(grid)
     # row and col
@@ -100,21 +123,29 @@ def check_all_constraints_for_cell(grid: List[List[int]], cages: List[Cage], r:
         if grid[i][c] == value:
             return False
     # cage checks
-    # find cage containing (r,c)
+    # find cage containing (r,c): O(1) through the index when given
+    if cell_to_cage is not None:
+        cage = cell_to_cage.get((r,c))
+        if cage is None:
+            return True
+        return check_cage_for_cell(grid, cage, r, c, value)
     for cage in cages:
         if (r,c) in cage['cells']:
-            # build values for cage after hypothetical placement
-            vals = []
-            for (rr,cc) in cage['cells']:
-                if rr == r and cc == c:
-                    vals.append(value)
-                else:
-                    vals.append(grid[rr][cc])
-            if not cage_valid_partial(vals, cage['target'], cage['op'], n):
-                return False
-            # if fully filled, ensure exact satisfaction
-            if all(v != 0 for v in vals):
-                if not cage_satisfied(vals, cage['target'], cage['op']):
-                    return False
-            break
+            return check_cage_for_cell(grid, cage, r, c, value)
+    return True
+
+def check_cage_for_cell(grid: List[List[int]], cage: Cage, r: int, c: int, value: int) -> bool:
+    # build values for cage after hypothetical placement
+    vals = []
+    for (rr,cc) in cage['cells']:
+        if rr == r and cc == c:
+            vals.append(value)
+        else:
+            vals.append(grid[rr][cc])
+    if not cage_valid_partial(vals, cage['target'], cage['op'], len(grid)):
+        return False
+    # if fully filled, ensure exact satisfaction
+    if all(v != 0 for v in vals):
+        if not cage_satisfied(vals, cage['target'], cage['op']):
+            return False
     return True
@@ -1,21 +1,128 @@
+import math
 import random
 import time
-import copy
 from typing import List, Tuple, Dict, Any
 from grid import KenKenGrid
 from constraints import cage_satisfied
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fitness falls back to the per-individual loop
+    np = None
+
+# Full-grid cage tests, (grid, coords, target) -> bool, picked once per cage;
+# same answers as constraints.cage_satisfied without building a value list.
+
+def sum_holds(g, coords, target: int) -> bool:
+    s = 0
+    for r, c in coords:
+        s += g[r][c]
+    return s == target
+
+def product_holds(g, coords, target: int) -> bool:
+    p = 1
+    for r, c in coords:
+        p *= g[r][c]
+    return p == target
+
+def difference_holds(g, coords, target: int) -> bool:
+    (r1, c1), (r2, c2) = coords
+    return abs(g[r1][c1] - g[r2][c2]) == target
+
+def quotient_holds(g, coords, target: int) -> bool:
+    (r1, c1), (r2, c2) = coords
+    a, b = g[r1][c1], g[r2][c2]
+    return a == b * target or b == a * target
+
+def given_holds(g, coords, target: int) -> bool:
+    r, c = coords[0]
+    return g[r][c] == target
+
+def never_holds(g, coords, target: int) -> bool:
+    return False
+
+def choose_cage_test(op: str, size: int):
+    if op == '+':
+        return sum_holds
+    if op == '*':
+        return product_holds
+    if op == '-' and size == 2:
+        return difference_holds
+    if op == '/' and size == 2:
+        return quotient_holds
+    if op == '=' and size >= 1:
+        return given_holds
+    return never_holds
+
+class Individual(list):
+    """A candidate grid (list of rows) carrying its own violation counts.
+
+    dups[c] is the number of duplicates in column c, bad[k] whether cage k is
+    violated and fit the total, the same number fitness() computes. The
+    operators below re-count only the columns and cages a change touches, so
+    a child is never rescored from scratch.
+    """
+    __slots__ = ('dups', 'bad', 'fit')
+
+    def copy(self) -> 'Individual':
+        out = Individual([row[:] for row in self])
+        out.dups = self.dups[:]
+        out.bad = self.bad[:]
+        out.fit = self.fit
+        return out
+
 class CulturalAlgorithm:
-    def __init__(self, grid_obj: KenKenGrid, pop_size: int = 200, elite_fraction: float = 0.1, max_gen: int = 1000):
+    def __init__(self, grid_obj: KenKenGrid, pop_size: int = 200, elite_fraction: float = 0.1, max_gen: int = 1000,
+                 hybrid: bool = False, stagnation_window: int = 25, local_search_steps: int = 0):
+        # hybrid: min-conflicts local search on the elites every generation and a
+        # belief-guided restart when the best fitness has not improved for
+        # `stagnation_window` generations (local_search_steps 0 = 4*N per elite)
         self.grid_obj = grid_obj
         self.n = grid_obj.n
         self.cages = grid_obj.get_cages()
         self.pop_size = max(20, pop_size)
         self.elite_fraction = max(0.05, min(0.4, elite_fraction))
         self.max_gen = max(10, max_gen)
-        # belief: probability matrix per cell for values 1..n, initially uniform
-        self.belief = [[[1.0/self.n for _ in range(self.n)] for _ in range(self.n)] for _ in range(self.n)]
-        self.population: List[List[List[int]]] = []
+        # belief: probability of each value 1..n per cell, initially uniform;
+        # an (N, N, N) array with NumPy, nested lists otherwise
+        if np is not None:
+            self.belief = np.full((self.n, self.n, self.n), 1.0 / self.n)
+            # bulk draws for mutation; seeded from `random`, so random.seed()
+            # still makes a run reproducible
+            self.rng = np.random.default_rng(random.getrandbits(64))
+        else:
+            self.belief = [[[1.0/self.n for _ in range(self.n)] for _ in range(self.n)] for _ in range(self.n)]
+            self.rng = None
+        self.population: List[Individual] = []
+        self.cage_groups = None  # built by population_fitness on first use
+        self.hybrid = hybrid
+        self.stagnation_window = max(2, stagnation_window)
+        self.local_search_steps = local_search_steps or 4 * self.n
+        self.restarts = 0
+        # cage lookups come straight from the cage dicts; the GA needs none of
+        # the filling tables compile_model enumerates
+        cell_cage = [-1] * (self.n * self.n)  # flat cell index -> cage index or -1
+        self.cage_checks = []
+        self.cage_rows = []  # row bitmask per cage
+        for k, cage in enumerate(self.cages):
+            coords = tuple(cage['cells'])
+            for r, c in coords:
+                cell_cage[r * self.n + c] = k
+            self.cage_checks.append((choose_cage_test(cage['op'], len(coords)), coords, cage['target']))
+            self.cage_rows.append(sum(1 << r for r in {r for r, _ in coords}))
+        self.cell_cage = tuple(cell_cage)
+
+    def compile_cage_groups(self):
+        # cages grouped by (op, size) as flat cell-index arrays, so a whole
+        # population is scored with a few batched array operations
+        groups: Dict[Tuple[str, int], Tuple[List[List[int]], List[int]]] = {}
+        for cage in self.cages:
+            key = (cage['op'], len(cage['cells']))
+            idx, targets = groups.setdefault(key, ([], []))
+            idx.append([r * self.n + c for (r, c) in cage['cells']])
+            targets.append(cage['target'])
+        return [(op, size, np.array(idx, dtype=np.intp), np.array(targets, dtype=np.int64))
+                for (op, size), (idx, targets) in groups.items()]
 
     def random_individual(self):
         # Each row is a permutation to satisfy row uniqueness
@@ -25,7 +132,50 @@ class CulturalAlgorithm:
             row = nums[:]
             random.shuffle(row)
             grid.append(row)
-        return grid
+        return self.as_individual(grid)
+
+    def as_individual(self, grid: List[List[int]]) -> Individual:
+        # full scoring, only for grids that come from outside the operators
+        # (initial population, restarts, migrants)
+        if isinstance(grid, Individual):
+            return grid
+        ind = Individual([row[:] for row in grid])
+        ind.dups = [self.n - len(set(col)) for col in zip(*ind)]
+        ind.bad = [not self.cage_ok(ind, k) for k in range(len(self.cages))]
+        ind.fit = sum(ind.dups) + sum(ind.bad)
+        return ind
+
+    def recount(self, ind: Individual, cols, cages):
+        # re-count columns `cols` and re-test cages `cages` (-1 = no cage)
+        # after some of their cells changed
+        n = self.n
+        dups, bad = ind.dups, ind.bad
+        fit = ind.fit
+        for c in cols:
+            now = n - len({row[c] for row in ind})
+            fit += now - dups[c]
+            dups[c] = now
+        for k in cages:
+            if k >= 0:
+                now = not self.cage_ok(ind, k)
+                fit += now - bad[k]
+                bad[k] = now
+        ind.fit = fit
+
+    def swap(self, ind: Individual, r: int, i: int, j: int):
+        # swap two cells of row r: touches columns i and j and at most two cages
+        row = ind[r]
+        row[i], row[j] = row[j], row[i]
+        base = r * self.n
+        self.recount(ind, (i, j), {self.cell_cage[base + i], self.cell_cage[base + j]})
+
+    def set_row(self, ind: Individual, r: int, values: List[int]):
+        # overwrite row r; only the cells that differ are re-counted
+        row = ind[r]
+        base = r * self.n
+        changed = [c for c in range(self.n) if row[c] != values[c]]
+        row[:] = values
+        self.recount(ind, changed, {self.cell_cage[base + c] for c in changed})
 
     def fitness(self, grid: List[List[int]]) -> int:
         # count violations: column duplicates + cage violations
@@ -45,7 +195,67 @@ class CulturalAlgorithm:
                     violations += 1
         return violations
 
+    def violations(self, grid: List[List[int]]) -> Dict[str, int]:
+        # fitness() broken down by constraint type ('column', 'cage+', ...)
+        out: Dict[str, int] = {}
+        for c in range(self.n):
+            dup = self.n - len({grid[r][c] for r in range(self.n)})
+            if dup:
+                out['column'] = out.get('column', 0) + dup
+        for cage in self.cages:
+            vals = [grid[r][c] for (r,c) in cage['cells']]
+            if any(v == 0 for v in vals) or not cage_satisfied(vals, cage['target'], cage['op']):
+                key = 'cage' + cage['op']
+                out[key] = out.get(key, 0) + 1
+        return out
+
+    def population_fitness(self, population: List[List[List[int]]]) -> List[int]:
+        # same violation count as fitness(), for every individual at once. Not on
+        # the GA's own path (individuals carry incremental counts, see
+        # as_individual); kept as an API for scoring many plain grids at once
+        if np is None or not population:
+            return [self.fitness(g) for g in population]
+        if self.cage_groups is None:
+            self.cage_groups = self.compile_cage_groups()
+        pop = np.asarray(population, dtype=np.int64)  # (P, N, N)
+        P = pop.shape[0]
+        # column duplicates: equal neighbours after sorting each column
+        cols = np.sort(pop, axis=1)
+        violations = (cols[:, 1:, :] == cols[:, :-1, :]).sum(axis=(1, 2))
+        flat = pop.reshape(P, self.n * self.n)
+        for op, size, idx, targets in self.cage_groups:
+            vals = flat[:, idx]  # (P, cages, size)
+            if op == '+':
+                bad = vals.sum(axis=2) != targets
+            elif op == '*':
+                bad = vals.prod(axis=2) != targets
+            elif op == '-' and size == 2:
+                bad = np.abs(vals[:, :, 0] - vals[:, :, 1]) != targets
+            elif op == '/' and size == 2:
+                a, b = vals[:, :, 0], vals[:, :, 1]
+                bad = (a * targets != b) & (b * targets != a)
+            elif op == '=' and size >= 1:
+                bad = vals[:, :, 0] != targets
+            else:
+                # malformed cage (e.g. '-' over 3 cells) can never be satisfied
+                violations = violations + len(targets)
+                continue
+            violations = violations + bad.sum(axis=1)
+        return violations.tolist()
+
     def update_belief(self, elites: List[List[List[int]]], alpha: float = 0.3):
+        if np is not None:
+            n = self.n
+            self.belief *= (1 - alpha)
+            if len(elites) == 0:
+                return
+            # how often each (cell, value) occurs across the stacked elites
+            stack = np.asarray(elites, dtype=np.intp).reshape(len(elites), n * n) - 1
+            seen = np.bincount((np.arange(n * n) * n + stack).ravel(), minlength=n ** 3)
+            self.belief += (alpha / len(elites)) * seen.reshape(n, n, n)
+            s = self.belief.sum(axis=2, keepdims=True)
+            self.belief = np.where(s > 0, self.belief / np.where(s > 0, s, 1.0), 1.0 / n)
+            return
         # Decay old belief slightly
         for r in range(self.n):
             for c in range(self.n):
@@ -68,57 +278,300 @@ class CulturalAlgorithm:
                 else:
                     self.belief[r][c] = [x/s for x in self.belief[r][c]]
 
-   )
-              
+    def belief_copy(self):
+        # picklable snapshot of the belief space (sent between islands)
+        if np is not None:
+            return self.belief.copy()
+        return [[cell[:] for cell in row] for row in self.belief]
 
-    def crossover(self, a: List[List[int]], b: List[List[int]]):
-        # row-wise crossover (swap rows with probability 0.5)
-        child = [row[:] for row in a]
+    def merge_belief(self, incoming):
+        # average with another belief space of the same shape
+        if np is not None:
+            self.belief = (self.belief + np.asarray(incoming, dtype=float)) / 2
+            return
         for r in range(self.n):
-            if random.random() < 0.5:
-                child[r] = b[r][:]
+            for c in range(self.n):
+                self.belief[r][c] = [(a + b) / 2 for a, b in zip(self.belief[r][c], incoming[r][c])]
+
+    def crossover(self, a: List[List[int]], b: List[List[int]]) -> Individual:
+        # row-wise crossover (swap rows with probability 0.5). A cage keeps the
+        # flag of the parent its (differing) rows all come from, so only cages
+        # straddling both parents' rows are re-tested; every column changes
+        # when a row does, so those are re-counted whole.
+        a, b = self.as_individual(a), self.as_individual(b)
+        diff = take = 0
+        for r in range(self.n):
+            if a[r] != b[r]:
+                diff |= 1 << r
+                if random.random() < 0.5:
+                    take |= 1 << r
+        if not take:
+            return a.copy()
+        if take == diff:
+            return b.copy()
+        child = Individual([(b if take >> r & 1 else a)[r][:] for r in range(self.n)])
+        child.dups = [self.n - len(set(col)) for col in zip(*child)]
+        bad = a.bad[:]
+        for k, rows in enumerate(self.cage_rows):
+            hit = rows & take
+            if hit:
+                bad[k] = b.bad[k] if hit == rows & diff else not self.cage_ok(child, k)
+        child.bad = bad
+        child.fit = sum(child.dups) + sum(bad)
+        return child
+
+    def mutate(self, g: List[List[int]], mutation_rate: float = 0.15) -> Individual:
+        child = self.as_individual(g).copy()
+        self.mutate_population([child], mutation_rate)
         return child
 
-    def mutate(self, g: List[List[int]], mutation_rate: float = 0.15):
+    def mutate_population(self, population: List[Individual], mutation_rate: float = 0.15,
+                          resample_rate: float = 0.02):
+        """Mutate every individual in place: row swaps, then belief-guided resampling.
+
+        With NumPy the random draws for the whole population are made at once
+        from self.rng, resampled values come from the belief array by inverse
+        CDF, and Python only visits the rows that actually change.
+        """
+        if np is None:
+            for ind in population:
+                self.mutate_in_place(ind, mutation_rate, resample_rate)
+            return
+        n = self.n
+        P = len(population)
+        if P == 0:
+            return
+        rng = self.rng
+        # swap two positions in a row sometimes
+        ps, rs = np.nonzero(rng.random((P, n)) < mutation_rate)
+        i = rng.integers(n, size=len(ps))
+        j = rng.integers(n - 1, size=len(ps))
+        j += j >= i
+        for p, r, a, b in zip(ps.tolist(), rs.tolist(), i.tolist(), j.tolist()):
+            self.swap(population[p], r, a, b)
+        # guided resampling from belief, `resample_rate` per cell
+        ps, rs, cs = np.nonzero(rng.random((P, n, n)) < resample_rate)
+        if len(ps) == 0:
+            return
+        cdf = np.cumsum(self.belief[rs, cs], axis=1)
+        u = rng.random(len(ps)) * cdf[:, -1]
+        values = np.minimum((cdf < u[:, None]).sum(axis=1) + 1, n)
+        # nonzero() is in (individual, row, column) order: one repair per row
+        key, row = None, None
+        for p, r, c, v in zip(ps.tolist(), rs.tolist(), cs.tolist(), values.tolist()):
+            if (p, r) != key:
+                if row is not None:
+                    self.set_row(population[key[0]], key[1], self.repair_row(row))
+                key, row = (p, r), population[p][r][:]
+            row[c] = v
+        self.set_row(population[key[0]], key[1], self.repair_row(row))
+
+    def mutate_in_place(self, ind: Individual, mutation_rate: float = 0.15, resample_rate: float = 0.02):
+        # per-individual mutation with the `random` module (no NumPy)
         # swap two positions in a row sometimes
-        grid = [row[:] for row in g]
         for r in range(self.n):
             if random.random() < mutation_rate:
-                i,j = random.sample(range(self.n), 2)
-                grid[r][i], grid[r][j] = grid[r][j], grid[r][i]
-        # guided resampling from belief with small prob
+                i = random.randrange(self.n)
+                j = random.randrange(self.n - 1)
+                self.swap(ind, r, i, j + (j >= i))
+        # guided resampling from belief: each cell with probability
+        # resample_rate, visited by drawing the gap to the next resampled cell
+        n = self.n
+        cell = self.resample_gap(resample_rate)
+        while cell < n * n:
+            r = cell // n
+            row = ind[r][:]
+            while cell < n * n and cell // n == r:
+                c = cell % n
+                row[c] = random.choices(range(1, n+1), weights=self.belief[r][c], k=1)[0]
+                cell += 1 + self.resample_gap(resample_rate)
+            self.set_row(ind, r, self.repair_row(row))
+
+    def repair_row(self, row: List[int]) -> List[int]:
+        # replace repeated values with the missing ones, so the row is a permutation again
+        present = set(row)
+        if len(present) == self.n:
+            return row
+        missing = [v for v in range(1, self.n+1) if v not in present]
+        seen = set()
+        for i,v in enumerate(row):
+            if v in seen:
+                row[i] = missing.pop()
+            else:
+                seen.add(v)
+        return row
+
+    def resample_gap(self, p: float = 0.02) -> int:
+        # cells skipped before the next one resampled with probability p (geometric)
+        if p <= 0:
+            return self.n * self.n
+        if p >= 1:
+            return 0
+        return int(math.log(1.0 - random.random()) / math.log(1.0 - p))
+
+    def cage_ok(self, g: List[List[int]], k: int) -> bool:
+        holds, coords, target = self.cage_checks[k]
+        return holds(g, coords, target)
+
+    def local_search(self, ind: Individual, steps: int) -> int:
+        """Min-conflicts row swaps on `ind` in place; returns its new fitness.
+
+        Column value counts are kept alongside the individual's cage flags,
+        so each candidate swap is scored by its delta (two columns, at most
+        two cages) rather than a full fitness() recompute.
+        """
+        n = self.n
+        g, bad = ind, ind.bad
+        counts = [[0] * (n + 1) for _ in range(n)]
+        for row in g:
+            for c, v in enumerate(row):
+                counts[c][v] += 1
+
+        def swap_delta(r: int, i: int, j: int) -> int:
+            a, b = g[r][i], g[r][j]
+            # column i loses a and gains b, column j the reverse
+            delta = (counts[i][b] > 0) - (counts[i][a] > 1) + (counts[j][a] > 0) - (counts[j][b] > 1)
+            g[r][i], g[r][j] = b, a
+            for k in {self.cell_cage[r * n + i], self.cell_cage[r * n + j]}:
+                if k >= 0:
+                    delta += (not self.cage_ok(g, k)) - bad[k]
+            g[r][i], g[r][j] = a, b
+            return delta
+
+        for _ in range(steps):
+            if ind.fit == 0:
+                break
+            # a conflicted cell: in a column with duplicates or a violated cage
+            conflicted = [(r, c) for r in range(n) for c in range(n)
+                          if counts[c][g[r][c]] > 1 or (self.cell_cage[r * n + c] >= 0 and bad[self.cell_cage[r * n + c]])]
+            if not conflicted:
+                break
+            r, i = random.choice(conflicted)
+            best_delta, best_moves = None, []
+            for j in range(n):
+                if j == i:
+                    continue
+                delta = swap_delta(r, i, j)
+                if best_delta is None or delta < best_delta:
+                    best_delta, best_moves = delta, [j]
+                elif delta == best_delta:
+                    best_moves.append(j)
+            # sideways moves are allowed; uphill only as occasional noise
+            if best_delta > 0 and random.random() > 0.1:
+                continue
+            j = random.choice(best_moves)
+            a, b = g[r][i], g[r][j]
+            counts[i][a] -= 1
+            counts[i][b] += 1
+            counts[j][b] -= 1
+            counts[j][a] += 1
+            self.swap(ind, r, i, j)
+        return ind.fit
+
+    def belief_individual(self) -> Individual:
+        # each row a permutation sampled cell by cell from the belief space
+        belief = self.belief.tolist() if np is not None else self.belief
+        grid = []
         for r in range(self.n):
-            for c in range(self.n):
-                if random.random() < 0.02:
-                    probs = self.belief[r][c]
-                    grid[r][c] = random.choices(range(1, self.n+1), weights=probs, k=1)[0]
-            # repair row
-            missing = [v for v in range(1, self.n+1) if v not in grid[r]]
-            seen = set()
-            for i,v in enumerate(grid[r]):
-                if v in seen:
-                    grid[r][i] = missing.pop()
-                else:
-                    seen.add(v)
-        return grid
+            remaining = list(range(1, self.n + 1))
+            row = [0] * self.n
+            cols = list(range(self.n))
+            random.shuffle(cols)
+            for c in cols:
+                weights = [belief[r][c][v - 1] + 1e-9 for v in remaining]
+                v = random.choices(remaining, weights=weights, k=1)[0]
+                remaining.remove(v)
+                row[c] = v
+            grid.append(row)
+        return self.as_individual(grid)
+
+    def restart(self, scored: List[Tuple[int, Individual]]):
+        # keep the elites, resample everyone else from the belief space, and
+        # flatten the belief halfway back to uniform so it can be re-learned
+        self.restarts += 1
+        k = max(1, int(self.elite_fraction * self.pop_size))
+        if np is not None:
+            self.belief = 0.5 * self.belief + 0.5 / self.n
+        else:
+            for r in range(self.n):
+                for c in range(self.n):
+                    self.belief[r][c] = [0.5 * p + 0.5 / self.n for p in self.belief[r][c]]
+        self.population = [g for _, g in scored[:k]]
+        self.population += [self.belief_individual() for _ in range(self.pop_size - k)]
 
-    def solve(self, timeout_seconds: float = 5.0):
+    def improve_elites(self, scored: List[Tuple[int, Individual]]) -> List[Tuple[int, Individual]]:
+        k = max(1, int(self.elite_fraction * self.pop_size))
+        improved = [(self.local_search(g, self.local_search_steps), g) for _, g in scored[:k]]
+        scored = improved + scored[k:]
+        scored.sort(key=lambda x: x[0])
+        return scored
+
+    def evaluate(self) -> List[Tuple[int, Individual]]:
+        # (fitness, individual) pairs, best first; fitness comes from each
+        # individual's cached counts, so only outside grids are scored here
+        self.population = [self.as_individual(g) for g in self.population]
+        scored = [(g.fit, g) for g in self.population]
+        scored.sort(key=lambda x: x[0])
+        return scored
+
+    def next_generation(self, scored: List[Tuple[int, List[List[int]]]]):
+        # elites
+        k = max(1, int(self.elite_fraction * self.pop_size))
+        elites = [self.as_individual(g) for _,g in scored[:k]]
+        # update belief
+        self.update_belief(elites)
+        # new population: carry elites
+        newpop = elites[:]
+        children = []
+        while len(newpop) + len(children) < self.pop_size:
+            # selection tournament
+            a = min(random.sample(scored, 3), key=lambda x: x[0])[1]
+            b = min(random.sample(scored, 3), key=lambda x: x[0])[1]
+            children.append(self.crossover(a,b))
+        # all children mutated in one pass
+        self.mutate_population(children)
+        self.population = newpop + children
+
+    def solve(self, timeout_seconds: float = 5.0, cancel=None, on_generation=None, stats=None):
+        # cancel: anything with is_set() (e.g. threading.Event) to stop early;
+        # on_generation(generation, best_fitness) is called after each generation;
+        # stats: optional stats.SearchStats (nodes = individuals evaluated,
+        # failures = violations of each generation's best individual)
         start = time.time()
+        result = self._solve(start, timeout_seconds, cancel, on_generation, stats)
+        if stats is not None:
+            stats.total_time += time.time() - start
+        return result
+
+    def _solve(self, start: float, timeout_seconds: float, cancel, on_generation, stats):
         # init population
         self.population = [self.random_individual() for _ in range(self.pop_size)]
         best = None
         best_fit = float('inf')
         history = []
         iterations = 0
+        last_restart = 0
 
         for gen in range(self.max_gen):
-            scored = [(self.fitness(g), g) for g in self.population]
-            scored.sort(key=lambda x: x[0])
+            if stats is None:
+                scored = self.evaluate()
+            else:
+                t0 = time.perf_counter()
+                scored = self.evaluate()
+                stats.check_time += time.perf_counter() - t0
+                stats.generations += 1
+                stats.nodes += len(scored)
+                for kind, count in self.violations(scored[0][1]).items():
+                    stats.failures[kind] = stats.failures.get(kind, 0) + count
+            if self.hybrid:
+                scored = self.improve_elites(scored)
             iterations += 1
             if scored[0][0] < best_fit:
                 best_fit = scored[0][0]
-                best = copy.deepcopy(scored[0][1])
+                best = [row[:] for row in scored[0][1]]
             history.append(best_fit)
+            if on_generation is not None:
+                on_generation(iterations, best_fit)
             # success condition
             if best_fit == 0:
                 # return as KenKenGrid
@@ -127,24 +580,17 @@ class CulturalAlgorithm:
                 end = time.time()
                 return True, out_grid, end - start, iterations
 
-            # elites
-            k = max(1, int(self.elite_fraction * self.pop_size))
-            elites = [g for _,g in scored[:k]]
-            # update belief
-            self.update_belief(elites)
-            # new population: carry elites
-            newpop = elites[:]
-            while len(newpop) < self.pop_size:
-                # selection tournament
-                a = min(random.sample(scored, 3), key=lambda x: x[0])[1]
-                b = min(random.sample(scored, 3), key=lambda x: x[0])[1]
-                child = self.crossover(a,b)
-                child = self.mutate(child)
-                newpop.append(child)
-            self.population = newpop
+            window = self.stagnation_window
+            if self.hybrid and len(history) - last_restart >= window and history[-1] == history[-window]:
+                self.restart(scored)
+                last_restart = len(history)
+            else:
+                self.next_generation(scored)
 
             if time.time() - start > timeout_seconds:
                 break
+            if cancel is not None and cancel.is_set():
+                break
 
         # finished without perfect solution: return best found
         if best is not None:
@@ -0,0 +1,218 @@
+import time
+from typing import List, Tuple, Optional
+from grid import KenKenGrid
+from cage_tables import cage_fillings
+
+# Exact-cover columns, for an N x N puzzle:
+#   cell (r,c) filled          -> r*N + c
+#   row r holds value v        -> N*N + r*N + (v-1)
+#   column c holds value v     -> 2*N*N + c*N + (v-1)
+# Every cage contributes one matrix row per valid filling, covering all of
+# its cells at once; cells outside any cage get one row per value.
+
+class DancingLinks:
+    """Algorithm X over a sparse 0/1 matrix stored as circular doubly linked lists."""
+
+    def __init__(self, num_columns: int):
+        # node 0 is the root header, nodes 1..num_columns are column headers
+        self.L = list(range(-1, num_columns))
+        self.R = list(range(1, num_columns + 2))
+        self.L[0] = num_columns
+        self.R[num_columns] = 0
+        self.U = list(range(num_columns + 1))
+        self.D = list(range(num_columns + 1))
+        self.C = list(range(num_columns + 1))
+        self.S = [0] * (num_columns + 1)
+        self.row_of = [-1] * (num_columns + 1)
+        self.num_rows = 0
+        self.nodes = 0
+
+    def add_row(self, columns: List[int]) -> int:
+        row_id = self.num_rows
+        self.num_rows += 1
+        first = -1
+        for col in columns:
+            header = col + 1
+            node = len(self.C)
+            self.C.append(header)
+            self.row_of.append(row_id)
+            # insert at the bottom of the column
+            self.U.append(self.U[header])
+            self.D.append(header)
+            self.D[self.U[header]] = node
+            self.U[header] = node
+            self.S[header] += 1
+            if first < 0:
+                first = node
+                self.L.append(node)
+                self.R.append(node)
+            else:
+                self.L.append(self.L[first])
+                self.R.append(first)
+                self.R[self.L[first]] = node
+                self.L[first] = node
+        return row_id
+
+    def cover(self, c: int):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                D[U[j]] = D[j]
+                U[D[j]] = U[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c: int):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                D[U[j]] = j
+                U[D[j]] = j
+                j = L[j]
+            i = U[i]
+        R[L[c]] = c
+        L[R[c]] = c
+
+    def search(self, max_solutions: int, on_solution, cancel=None, progress=None) -> int:
+        # returns the number of solutions reported to on_solution; stops early
+        # once `cancel` (anything with is_set()) is set. progress(nodes, depth)
+        # is called every 256 nodes when given
+        found = 0
+        partial: List[int] = []
+        L, R, D, C, S = self.L, self.R, self.D, self.C, self.S
+        self.nodes = 0
+
+        def recurse() -> bool:
+            nonlocal found
+            if R[0] == 0:
+                found += 1
+                on_solution([self.row_of[node] for node in partial])
+                return found >= max_solutions
+            # column with the fewest rows (Knuth's S heuristic)
+            c = R[0]
+            best = c
+            while c != 0:
+                if S[c] < S[best]:
+                    best = c
+                    if S[c] == 0:
+                        break
+                c = R[c]
+            if S[best] == 0:
+                return False
+            if self.nodes % 256 == 0:
+                if progress is not None:
+                    progress(self.nodes, len(partial))
+                if cancel is not None and cancel.is_set():
+                    return True
+            self.nodes += 1
+            self.cover(best)
+            r = D[best]
+            while r != best:
+                partial.append(r)
+                j = R[r]
+                while j != r:
+                    self.cover(C[j])
+                    j = R[j]
+                stop = recurse()
+                j = L[r]
+                while j != r:
+                    self.uncover(C[j])
+                    j = L[j]
+                partial.pop()
+                if stop:
+                    self.uncover(best)
+                    return True
+                r = D[r]
+            self.uncover(best)
+            return False
+
+        recurse()
+        return found
+
+def build_exact_cover(grid_obj: KenKenGrid) -> Tuple[DancingLinks, List[List[Tuple[int, int, int]]]]:
+    """Compile a KenKenGrid into a DLX matrix; also returns each matrix row's (r, c, value) placements."""
+    n = grid_obj.n
+    dlx = DancingLinks(3 * n * n)
+    placements: List[List[Tuple[int, int, int]]] = []
+
+    def columns_for(cells_vals: List[Tuple[int, int, int]]) -> List[int]:
+        cols = []
+        for (r, c, v) in cells_vals:
+            cols.append(r * n + c)
+            cols.append(n * n + r * n + (v - 1))
+            cols.append(2 * n * n + c * n + (v - 1))
+        return cols
+
+    def consistent(r: int, c: int, v: int) -> bool:
+        # respect values already in the grid
+        given = grid_obj.grid[r][c]
+        return given == 0 or given == v
+
+    caged = set()
+    for cage in grid_obj.get_cages():
+        cells = cage['cells']
+        caged.update(cells)
+        for filling in cage_fillings(cage, n):
+            row = [(r, c, v) for (r, c), v in zip(cells, filling)]
+            if all(consistent(r, c, v) for (r, c, v) in row):
+                dlx.add_row(columns_for(row))
+                placements.append(row)
+    for r in range(n):
+        for c in range(n):
+            if (r, c) in caged:
+                continue
+            for v in range(1, n + 1):
+                if consistent(r, c, v):
+                    dlx.add_row(columns_for([(r, c, v)]))
+                    placements.append([(r, c, v)])
+    return dlx, placements
+
+def solve_dlx(grid_obj: KenKenGrid, max_solutions: int = 1, cancel=None,
+              progress=None) -> Tuple[bool, float, int]:
+
+    start = time.time()
+    dlx, placements = build_exact_cover(grid_obj)
+    first: Optional[List[int]] = None
+
+    def on_solution(rows: List[int]):
+        nonlocal first
+        if first is None:
+            first = rows
+
+    dlx.search(max_solutions, on_solution, cancel, progress)
+    if first is not None:
+        for row_id in first:
+            for (r, c, v) in placements[row_id]:
+                grid_obj.grid[r][c] = v
+    end = time.time()
+    return (first is not None, end-start, dlx.nodes)
+
+def count_solutions_dlx(grid_obj: KenKenGrid, limit: int = 2, collect: bool = False,
+                        cancel=None) -> Tuple[int, List[List[List[int]]]]:
+    """Count solutions up to `limit` with Dancing Links (2 is enough for a uniqueness check).
+
+    Same contract as backtracking.count_solutions: `grid_obj` is left
+    untouched and the result is (count, solutions), solutions empty unless
+    `collect`.
+    """
+    dlx, placements = build_exact_cover(grid_obj)
+    solutions: List[List[List[int]]] = []
+
+    def on_solution(rows: List[int]):
+        if collect:
+            matrix = [row[:] for row in grid_obj.grid]
+            for row_id in rows:
+                for (r, c, v) in placements[row_id]:
+                    matrix[r][c] = v
+            solutions.append(matrix)
+
+    count = dlx.search(max(1, limit), on_solution, cancel)
+    return count, solutions
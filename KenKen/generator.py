@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Any, Optional, Iterator
+from grid import KenKenGrid, Cell
+from backtracking import BitmaskSearch
+from propagation import reduce_grid, popcount
+from stats import SearchStats
+
+# Puzzle generator.
+#
+# A random Latin square is cut into connected cages (size and operation mix
+# under caller control) and every cage gets the target its cells have in the
+# square, so the square is always a solution. Uniqueness is then checked with
+# the MAC engine; while a second solution exists, the cage holding a cell
+# where the two solutions differ is split: that cell becomes an '=' cage and
+# the rest of the cage is re-cut into connected pieces. Each step fixes one
+# more cell, so the repair loop always terminates with a unique puzzle.
+
+DEFAULT_OPS = {'+': 3, '-': 2, '*': 3, '/': 2}
+NEIGHBOURS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+def random_latin_square(n: int, rng: random.Random) -> List[List[int]]:
+    # shuffled rows, columns and symbols of the cyclic square
+    rows = [[(r + c) % n + 1 for c in range(n)] for r in range(n)]
+    rng.shuffle(rows)
+    cols = list(range(n))
+    rng.shuffle(cols)
+    symbols = list(range(1, n + 1))
+    rng.shuffle(symbols)
+    return [[symbols[row[c] - 1] for c in cols] for row in rows]
+
+def partition_cages(cells: List[Cell], rng: random.Random, min_size: int = 1, max_size: int = 4) -> List[List[Cell]]:
+    """Cut `cells` into connected groups of (mostly) min_size..max_size cells."""
+    free = set(cells)
+    groups = []
+    for start in sorted(cells):
+        if start not in free:
+            continue
+        group = [start]
+        free.discard(start)
+        size = rng.randint(min_size, max_size)
+        while len(group) < size:
+            options = [(r + dr, c + dc) for r, c in group for dr, dc in NEIGHBOURS if (r + dr, c + dc) in free]
+            if not options:
+                break  # boxed in; the group stays smaller
+            cell = rng.choice(options)
+            free.discard(cell)
+            group.append(cell)
+        groups.append(group)
+    return groups
+
+def choose_cage(cells: List[Cell], solution: List[List[int]], rng: random.Random,
+                ops: Dict[str, float]) -> Tuple[str, int]:
+    # (op, target) for a cage over `cells`, drawn from the weights in `ops`
+    values = [solution[r][c] for r, c in cells]
+    if len(values) == 1:
+        return '=', values[0]
+    lo, hi = min(values), max(values)
+    allowed = {op: w for op, w in ops.items() if w > 0 and (op in '+*' or len(values) == 2)}
+    if '/' in allowed and hi % lo:
+        del allowed['/']
+    if not allowed:
+        allowed = {'+': 1}
+    op = rng.choices(list(allowed), weights=list(allowed.values()), k=1)[0]
+    if op == '+':
+        return op, sum(values)
+    if op == '-':
+        return op, hi - lo
+    if op == '/':
+        return op, hi // lo
+    product = 1
+    for v in values:
+        product *= v
+    return op, product
+
+def connected_pieces(cells: List[Cell]) -> List[List[Cell]]:
+    rest = set(cells)
+    pieces = []
+    while rest:
+        stack = [rest.pop()]
+        piece = []
+        while stack:
+            r, c = stack.pop()
+            piece.append((r, c))
+            for dr, dc in NEIGHBOURS:
+                if (r + dr, c + dc) in rest:
+                    rest.discard((r + dr, c + dc))
+                    stack.append((r + dr, c + dc))
+        pieces.append(sorted(piece))
+    return pieces
+
+def check_unique(grid_obj: KenKenGrid, stats: Optional[SearchStats] = None) -> List[List[List[int]]]:
+    # up to two solutions: one means the puzzle is unique
+    engine = BitmaskSearch(grid_obj.copy(), 2, use_propagation=True, collect=True, stats=stats)
+    engine.run()
+    return engine.solutions or []
+
+def repair(grid_obj: KenKenGrid, solution: List[List[int]], other: List[List[int]],
+           rng: random.Random, ops: Dict[str, float]) -> KenKenGrid:
+    """Split the cage of a cell where `other` differs from `solution`."""
+    n = grid_obj.n
+    diff = [(r, c) for r in range(n) for c in range(n)
+            if other[r][c] != solution[r][c] and len(grid_obj.cell_to_cage[(r, c)]['cells']) > 1]
+    cell = rng.choice(diff)
+    broken = grid_obj.cell_to_cage[cell]
+    out = KenKenGrid(n)
+    for cage in grid_obj.get_cages():
+        if cage is not broken:
+            out.add_cage(cage['cells'], cage['op'], cage['target'])
+    out.add_cage([cell], '=', solution[cell[0]][cell[1]])
+    for piece in connected_pieces([x for x in broken['cells'] if x != cell]):
+        op, target = choose_cage(piece, solution, rng, ops)
+        out.add_cage(piece, op, target)
+    return out
+
+def rate(grid_obj: KenKenGrid, stats: SearchStats) -> Dict[str, Any]:
+    """Difficulty from how much search the uniqueness proof needed.
+
+    'easy': propagation alone fixes every cell; 'medium': the MAC search
+    hits at most N dead ends; 'hard': anything more.
+    """
+    n = grid_obj.n
+    dead_ends = sum(stats.failures.values())
+    ok, domains, _ = reduce_grid(grid_obj)
+    if ok and all(popcount(m) == 1 for row in domains for m in row):
+        level = 'easy'
+    elif dead_ends <= n:
+        level = 'medium'
+    else:
+        level = 'hard'
+    return {'difficulty': level, 'nodes': stats.nodes, 'dead_ends': dead_ends,
+            'pruned': stats.pruned, 'max_depth': stats.max_depth, 'score': stats.nodes / (n * n)}
+
+def generate_puzzle(n: int, seed: Optional[int] = None, min_cage: int = 1, max_cage: int = 4,
+                    ops: Optional[Dict[str, float]] = None,
+                    max_repairs: Optional[int] = None) -> Tuple[Optional[KenKenGrid], List[List[int]], Dict[str, Any]]:
+    """Generate a unique-solution puzzle.
+
+    Returns (grid, solution, rating); grid is None if it was still ambiguous
+    after `max_repairs` cage splits (unbounded by default).
+    """
+    rng = random.Random(seed)
+    ops = DEFAULT_OPS if ops is None else ops
+    solution = random_latin_square(n, rng)
+    grid_obj = KenKenGrid(n)
+    cells = [(r, c) for r in range(n) for c in range(n)]
+    for group in partition_cages(cells, rng, max(1, min_cage), max(1, max_cage)):
+        op, target = choose_cage(group, solution, rng, ops)
+        grid_obj.add_cage(group, op, target)
+    repairs = 0
+    while True:
+        stats = SearchStats()
+        solutions = check_unique(grid_obj, stats)
+        if len(solutions) < 2:
+            break
+        if max_repairs is not None and repairs >= max_repairs:
+            return None, solution, {'repairs': repairs}
+        other = solutions[0] if solutions[0] != solution else solutions[1]
+        grid_obj = repair(grid_obj, solution, other, rng, ops)
+        repairs += 1
+    rating = rate(grid_obj, stats)
+    rating['repairs'] = repairs
+    return grid_obj, solution, rating
+
+def puzzle_record(index: int, n: int, seed: int, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # one JSONL-ready puzzle (same layout batch.py reads), or None if rejected
+    grid_obj, solution, rating = generate_puzzle(n, seed, **options)
+    if grid_obj is None:
+        return None
+    record = {'id': index, 'n': n, 'seed': seed}
+    record['cages'] = grid_obj.to_dict()['cages']
+    record['solution'] = solution
+    record.update(rating)
+    return record
+
+def _record_task(args):
+    return puzzle_record(*args)
+
+def generate_batch(count: int, n: int, seed: int = 0, workers: Optional[int] = None,
+                   **options) -> Iterator[Dict[str, Any]]:
+    """Generate `count` puzzles across a process pool, yielded in order.
+
+    Puzzle i uses seed `seed + i`, so a batch is reproducible whatever the
+    worker count. Puzzles rejected by max_repairs are skipped.
+    """
+    tasks = [(i, n, seed + i, options) for i in range(count)]
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1:
+        results = map(_record_task, tasks)
+        yield from (r for r in results if r is not None)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for record in pool.map(_record_task, tasks, chunksize=max(1, count // (workers * 8))):
+            if record is not None:
+                yield record
+
+def parse_ops(text: str) -> Dict[str, float]:
+    # "+:3,-:2,*:3,/:2" -> weights
+    ops = {}
+    for part in text.split(','):
+        op, _, weight = part.partition(':')
+        if op not in DEFAULT_OPS:
+            raise ValueError(f"Unknown operation {op!r}")
+        ops[op] = float(weight or 1)
+    return ops
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate unique-solution KenKen puzzles as JSONL.")
+    parser.add_argument('-n', '--size', type=int, default=6)
+    parser.add_argument('-c', '--count', type=int, default=100)
+    parser.add_argument('-o', '--output', default='-', help="JSONL file ('-' for stdout)")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-w', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--min-cage', type=int, default=1)
+    parser.add_argument('--max-cage', type=int, default=4)
+    parser.add_argument('--ops', default='+:3,-:2,*:3,/:2', help="operation weights")
+    parser.add_argument('--max-repairs', type=int, default=None, help="drop puzzles needing more cage splits")
+    parser.add_argument('--difficulty', choices=['easy', 'medium', 'hard'], default=None,
+                        help="only keep puzzles rated at this level")
+    args = parser.parse_args(argv)
+
+    options = {'min_cage': args.min_cage, 'max_cage': args.max_cage, 'ops': parse_ops(args.ops),
+               'max_repairs': args.max_repairs}
+    dst = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    kept = 0
+    try:
+        for record in generate_batch(args.count, args.size, args.seed, args.workers, **options):
+            if args.difficulty is not None and record['difficulty'] != args.difficulty:
+                continue
+            dst.write(json.dumps(record) + '\n')
+            kept += 1
+    finally:
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"{kept} puzzles written", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
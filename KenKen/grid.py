@@ -1,9 +1,19 @@
 from typing import List, Tuple, Optional, Dict, Any
-import copy
 
 Cell = Tuple[int, int]
 Cage = Dict[str, Any]  # {'cells': [(r,c)...], 'op': '+', 'target': 6}
 
+def parse_cage(text: str) -> Tuple[List[Cell], str, int]:
+    # "r1,c1,r2,c2,...;op;target", e.g. "0,0,0,1;+;5"
+    parts = text.split(';')
+    if len(parts) != 3:
+        raise ValueError("Cage must look like cells;op;target")
+    coords = parts[0].split(',')
+    if len(coords) % 2 != 0:
+        raise ValueError("Cell coords malformed")
+    cells = [(int(coords[i]), int(coords[i+1])) for i in range(0, len(coords), 2)]
+    return cells, parts[1].strip(), int(parts[2])
+
 class KenKenGrid:
 
     def __init__(self, n: int):
@@ -12,23 +22,37 @@ class KenKenGrid:
         self.n = n
         self.grid: List[List[int]] = [[0 for _ in range(n)] for _ in range(n)]
         self.cages: List[Cage] = []
+        self.cell_to_cage: Dict[Cell, Cage] = {}
 
     def reset(self):
         self.grid = [[0 for _ in range(self.n)] for _ in range(self.n)]
+        self.clear_cages()
+
+    def clear_cages(self):
         self.cages = []
+        self.cell_to_cage = {}
 
     def add_cage(self, cells: List[Cell], op: str, target: int):
         # Basic validation
         for (r, c) in cells:
             if not (0 <= r < self.n and 0 <= c < self.n):
                 raise ValueError(f"Cell {(r,c)} out of bounds for grid size {self.n}")
+            if (r, c) in self.cell_to_cage or cells.count((r, c)) > 1:
+                raise ValueError(f"Cell {(r,c)} already belongs to a cage")
         if op not in ['+', '-', '*', '/', '=']:
             raise ValueError("Operation must be one of + - * / =")
-        self.cages.append({'cells': cells, 'op': op, 'target': target})
+        cage = {'cells': cells, 'op': op, 'target': target}
+        self.cages.append(cage)
+        # cell -> cage index for O(1) lookups in the solvers and the GUI
+        for cell in cells:
+            self.cell_to_cage[cell] = cage
 
     def get_cages(self) -> List[Cage]:
         return self.cages
 
+    def get_cage_at(self, r: int, c: int) -> Optional[Cage]:
+        return self.cell_to_cage.get((r, c))
+
     def get_cell(self, r: int, c: int) -> int:
         return self.grid[r][c]
 
@@ -38,13 +62,43 @@ class KenKenGrid:
         self.grid[r][c] = value
 
     def to_matrix(self) -> List[List[int]]:
-        return copy.deepcopy(self.grid)
+        return [row[:] for row in self.grid]
 
     def from_matrix(self, mat: List[List[int]]):
         if len(mat) != self.n or any(len(row) != self.n for row in mat):
             raise ValueError("Matrix dimensions do not match grid size")
         self.grid = [row[:] for row in mat]
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'n': self.n,
+            'cages': [{'cells': [list(cell) for cell in cage['cells']], 'op': cage['op'], 'target': cage['target']}
+                      for cage in self.cages],
+            'grid': self.to_matrix(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'KenKenGrid':
+        # cages may be dicts or "cells;op;target" strings; 'grid' (givens) is optional
+        out = cls(int(data['n']))
+        if data.get('grid') is not None:
+            out.from_matrix(data['grid'])
+        for cage in data.get('cages', []):
+            if isinstance(cage, str):
+                cells, op, target = parse_cage(cage)
+            else:
+                cells, op, target = [tuple(cell) for cell in cage['cells']], cage['op'], int(cage['target'])
+            out.add_cage(cells, op, target)
+        return out
+
+    def copy(self) -> 'KenKenGrid':
+        # independent grid values, cages rebuilt so the cell index points at the copies
+        out = KenKenGrid(self.n)
+        out.from_matrix(self.grid)
+        for cage in self.cages:
+            out.add_cage(list(cage['cells']), cage['op'], cage['target'])
+        return out
+
     def is_complete(self) -> bool:
         for r in range(self.n):
             for c in range(self.n):
@@ -1,9 +1,13 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
-from grid import KenKenGrid
-from backtracking import solve_backtracking
+from grid import KenKenGrid, parse_cage
+from backtracking import solve_backtracking, solve_backtracking_mrv
 from cultural import CulturalAlgorithm
+from dlx import solve_dlx
+from portfolio import solve_portfolio
 import time
+import queue
+import threading
 
 class ScrollableFrame(tk.Frame):
     def __init__(self, parent, *args, **kw):
@@ -55,9 +59,7 @@ class KenKenGUI:
 
         self.size = 4
         self.grid_obj = KenKenGrid(self.size)
-        self.cells = []
         self.cages_input = []
-        self.cage_text_labels = {} 
         self.cage_colors = [
             "#FFE5E5",  # أحمر فاتح
             "#E5F3FF",  # أزرق فاتح
@@ -86,7 +88,7 @@ class KenKenGUI:
 
         tk.Label(settings, text="Algorithm:", bg="#f7f7fb").grid(row=0, column=2, padx=6)
         self.algo_var = tk.StringVar()
-        self.algo_menu = ttk.Combobox(settings, textvariable=self.algo_var, values=["Backtracking", "Cultural"], state="readonly", width=16)
+        self.algo_menu = ttk.Combobox(settings, textvariable=self.algo_var, values=["Backtracking", "Backtracking (MRV)", "Backtracking (MAC)", "Dancing Links", "Cultural", "Cultural (Hybrid)", "Portfolio"], state="readonly", width=16)
         self.algo_menu.current(0)
         self.algo_menu.grid(row=0, column=3, padx=6)
 
@@ -109,14 +111,22 @@ class KenKenGUI:
         self.grid_frame.pack(pady=10)
         self.canvas = None
         self.cell_size = 60 
-        self.cage_labels = {}  
 
         # buttons
         btn_frame = tk.Frame(content, bg="#f7f7fb")
         btn_frame.pack(pady=6)
-        tk.Button(btn_frame, text="Solve", command=self.solve, bg="#0b8457", fg="white", width=12).grid(row=0, column=0, padx=8)
-        tk.Button(btn_frame, text="Reset", command=self.reset, bg="#c62828", fg="white", width=12).grid(row=0, column=1, padx=8)
-        tk.Button(btn_frame, text="Clear Cages", command=self.clear_cages, width=12).grid(row=0, column=2, padx=8)
+        self.solve_button = tk.Button(btn_frame, text="Solve", command=self.solve, bg="#0b8457", fg="white", width=12)
+        self.solve_button.grid(row=0, column=0, padx=8)
+        self.cancel_button = tk.Button(btn_frame, text="Cancel", command=self.cancel_solve, width=12, state="disabled")
+        self.cancel_button.grid(row=0, column=1, padx=8)
+        tk.Button(btn_frame, text="Reset", command=self.reset, bg="#c62828", fg="white", width=12).grid(row=0, column=2, padx=8)
+        tk.Button(btn_frame, text="Clear Cages", command=self.clear_cages, width=12).grid(row=0, column=3, padx=8)
+
+        # background solving state
+        self.solve_thread = None
+        self.solve_target = None
+        self.cancel_event = None
+        self.solve_queue = queue.Queue()
 
         # metrics
         self.metrics_label = tk.Label(content, text="", bg="#f7f7fb", font=("Helvetica", 11))
@@ -135,6 +145,7 @@ class KenKenGUI:
             self.size_entry.delete(0, tk.END)
             self.size_entry.insert(0, "4")
             self.size = 4
+        self.cancel_solve()
         self.grid_obj = KenKenGrid(self.size)
         self.cages_input.clear()
         self.cage_listbox.delete(0, tk.END)
@@ -150,18 +161,12 @@ class KenKenGUI:
             messagebox.showerror("Error", "Enter cage definition")
             return
         try:
-            parts = text.split(';')
-            coords = parts[0].split(',')
-            if len(coords) % 2 != 0:
-                raise ValueError("Cell coords malformed")
-            cells = [(int(coords[i]), int(coords[i+1])) for i in range(0, len(coords), 2)]
-            op = parts[1].strip()
-            target = int(parts[2])
+            cells, op, target = parse_cage(text)
             self.grid_obj.add_cage(cells, op, target)
             self.cage_listbox.insert(tk.END, text)
             self.cage_entry.delete(0, tk.END)
             
-            self.update_cage_colors()
+            self.update_cage_colors(self.grid_obj.get_cages()[-1])
 
             self.scrollable.scrollable_frame.update_idletasks()
             self.scrollable.canvas.configure(scrollregion=self.scrollable.canvas.bbox("all"))
@@ -169,161 +174,165 @@ class KenKenGUI:
             messagebox.showerror("Error", f"Invalid cage format. Example: 0,0,0,1;+;5\n\n{e}")
 
     def clear_cages(self):
-        self.grid_obj.cages = []
+        self.grid_obj.clear_cages()
         self.cage_listbox.delete(0, tk.END)
         self.update_cage_colors()
         messagebox.showinfo("Info", "Cages cleared")
 
     def draw_grid(self):
-        # clear
+        # everything is a canvas item: one rectangle and one text per cell, thick
+        # border segments keyed by edge, and one label per cage
         for w in self.grid_frame.winfo_children():
             w.destroy()
-        self.cells = []
-        self.cage_labels = {}
-        
+        self.cell_rects = {}
+        self.cell_texts = {}
+        self.border_items = {}
+        self.cage_label_items = {}
+        self.cage_fill = {}
+        self.editor = None
+        self.editing = None
+
+        # shrink cells for large N so the whole board stays on screen
+        self.cell_size = max(20, min(60, 600 // self.size))
         canvas_size = self.size * self.cell_size + 20
-        self.canvas = tk.Canvas(self.grid_frame, width=canvas_size, height=canvas_size, 
+        self.canvas = tk.Canvas(self.grid_frame, width=canvas_size, height=canvas_size,
                                 bg="white", highlightthickness=0)
         self.canvas.pack()
-        
+        self.canvas.bind("<Button-1>", self.on_canvas_click)
+
+        font_size = max(8, min(14, self.cell_size // 4))
         for r in range(self.size):
-            row = []
             for c in range(self.size):
-                x1 = c * self.cell_size + 10
-                y1 = r * self.cell_size + 10
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline="#cccccc", width=1)
-                
-                e = tk.Entry(self.grid_frame, width=3, justify='center', 
-                            font=("Helvetica", 14), borderwidth=0, highlightthickness=0, bg="white")
-                e.place(x=x1+2, y=y1+2, width=self.cell_size-4, height=self.cell_size-4)
-                row.append(e)
-            self.cells.append(row)
-        
-        self.cage_text_labels = {}
-        
+                x1, y1, x2, y2 = self.cell_bounds(r, c)
+                self.cell_rects[(r, c)] = self.canvas.create_rectangle(x1, y1, x2, y2, fill="white",
+                                                                       outline="#cccccc", width=1)
+                self.cell_texts[(r, c)] = self.canvas.create_text((x1 + x2) / 2, (y1 + y2) / 2 + 4, text="",
+                                                                  font=("Helvetica", font_size))
+        end = self.size * self.cell_size + 10
+        self.canvas.create_rectangle(10, 10, end, end, width=3, outline="black")
+
+        for idx, cage in enumerate(self.grid_obj.get_cages()):
+            self.cage_fill[id(cage)] = self.cage_colors[idx % len(self.cage_colors)]
         self.draw_cage_borders()
-    
-    def draw_cage_borders(self):
+        self.fill_grid_from_gridobj()
+
+    def cell_bounds(self, r, c):
+        x1 = c * self.cell_size + 10
+        y1 = r * self.cell_size + 10
+        return x1, y1, x1 + self.cell_size, y1 + self.cell_size
+
+    def draw_cage_borders(self, cells=None):
+        # (re)draw borders, fills and labels for `cells` only (all cells by
+        # default); edges between cells in different cages get a thick line
         if self.canvas is None:
             return
-        
-        cages = self.grid_obj.get_cages()
-        border_width = 3
-        
-        all_caged_cells = set()
-        for cage in cages:
-            all_caged_cells.update(cage['cells'])
-        
-        for r in range(self.size):
-            for c in range(self.size):
-                cell = (r, c)
-                x1 = c * self.cell_size + 10
-                y1 = r * self.cell_size + 10
-                x2 = (c + 1) * self.cell_size + 10
-                y2 = (r + 1) * self.cell_size + 10
-                
-               
-                if c < self.size - 1:
-                    right_cell = (r, c + 1)
-                    cell_cage = next((i for i, cage in enumerate(cages) if cell in cage['cells']), -1)
-                    right_cage = next((i for i, cage in enumerate(cages) if right_cell in cage['cells']), -1)
-                    if cell_cage != right_cage:
-                        self.canvas.create_line(x2, y1, x2, y2, width=border_width, fill="black")
-                
-               
-                if r < self.size - 1:
-                    bottom_cell = (r + 1, c)
-                    cell_cage = next((i for i, cage in enumerate(cages) if cell in cage['cells']), -1)
-                    bottom_cage = next((i for i, cage in enumerate(cages) if bottom_cell in cage['cells']), -1)
-                    if cell_cage != bottom_cage:
-                        self.canvas.create_line(x1, y2, x2, y2, width=border_width, fill="black")
-        
-        self.canvas.create_line(10, 10, self.size * self.cell_size + 10, 10, 
-                               width=border_width, fill="black")
-        self.canvas.create_line(10, 10, 10, self.size * self.cell_size + 10, 
-                               width=border_width, fill="black")
-        self.canvas.create_line(self.size * self.cell_size + 10, 10, 
-                               self.size * self.cell_size + 10, self.size * self.cell_size + 10, 
-                               width=border_width, fill="black")
-        self.canvas.create_line(10, self.size * self.cell_size + 10, 
-                               self.size * self.cell_size + 10, self.size * self.cell_size + 10, 
-                               width=border_width, fill="black")
-        
-        for label in self.cage_text_labels.values():
-            label.destroy()
-        self.cage_text_labels.clear()
-        
-        for idx, cage in enumerate(cages):
-            cells = cage['cells']
-            if not cells:
-                continue
-            
-           
-            op_symbol = {
-                '+': '+',
-                '-': '-',
-                '*': '×',
-                '/': '÷',
-                '=': '='
-            }.get(cage['op'], cage['op'])
-            
-           
-            cage_text = f"{op_symbol}{cage['target']}"
-            
-          
-            first_cell = cells[0]
-            r, c = first_cell
-            
-           
-            x = c * self.cell_size + 10 + 3
-            y = r * self.cell_size + 10 + 3
-            
-           
-            label = tk.Label(self.grid_frame, text=cage_text, 
-                           font=("Helvetica", 9, "bold"), 
-                           bg="white", fg="black",
-                           borderwidth=0, highlightthickness=0)
-            label.place(x=x, y=y)
-            
-           
-            self.cage_text_labels[first_cell] = label
-            self.cage_labels[first_cell] = label
-    
-    def update_cage_colors(self):
-       
-        
-        if self.canvas is not None:
-            self.draw_cage_borders()
-        
-        for r in range(self.size):
-            for c in range(self.size):
-                if self.cells and r < len(self.cells) and c < len(self.cells[r]):
-                    self.cells[r][c].config(bg="white")
-        
-       
-        cages = self.grid_obj.get_cages()
-        for idx, cage in enumerate(cages):
-            color = self.cage_colors[idx % len(self.cage_colors)]
-            for (r, c) in cage['cells']:
-                if 0 <= r < self.size and 0 <= c < self.size:
-                    if self.cells and r < len(self.cells) and c < len(self.cells[r]):
-                        self.cells[r][c].config(bg=color)
-          
-            if cage['cells'] and cage['cells'][0] in self.cage_text_labels:
-                self.cage_text_labels[cage['cells'][0]].config(bg=color)
+        cell_to_cage = self.grid_obj.cell_to_cage
+        if cells is None:
+            cells = [(r, c) for r in range(self.size) for c in range(self.size)]
+        for (r, c) in cells:
+            cage = cell_to_cage.get((r, c))
+            color = self.cage_fill.get(id(cage), "white") if cage is not None else "white"
+            self.canvas.itemconfig(self.cell_rects[(r, c)], fill=color)
+            x1, y1, x2, y2 = self.cell_bounds(r, c)
+            # right and bottom edge of this cell, left and top edge via the neighbours
+            edges = []
+            if c < self.size - 1:
+                edges.append((('v', r, c), (r, c + 1), (x2, y1, x2, y2)))
+            if r < self.size - 1:
+                edges.append((('h', r, c), (r + 1, c), (x1, y2, x2, y2)))
+            if c > 0:
+                edges.append((('v', r, c - 1), (r, c - 1), (x1, y1, x1, y2)))
+            if r > 0:
+                edges.append((('h', r - 1, c), (r - 1, c), (x1, y1, x2, y1)))
+            for key, other, coords in edges:
+                needed = cage is not cell_to_cage.get(other)
+                item = self.border_items.get(key)
+                if needed and item is None:
+                    self.border_items[key] = self.canvas.create_line(*coords, width=3, fill="black")
+                elif not needed and item is not None:
+                    self.canvas.delete(item)
+                    del self.border_items[key]
+
+        for cage in {id(cell_to_cage[cell]): cell_to_cage[cell] for cell in cells if cell in cell_to_cage}.values():
+            self.draw_cage_label(cage)
+
+    def draw_cage_label(self, cage):
+        if not cage['cells'] or id(cage) in self.cage_label_items:
+            return
+        op_symbol = {
+            '+': '+',
+            '-': '-',
+            '*': '×',
+            '/': '÷',
+            '=': '='
+        }.get(cage['op'], cage['op'])
+        r, c = cage['cells'][0]
+        x1, y1, _, _ = self.cell_bounds(r, c)
+        self.cage_label_items[id(cage)] = self.canvas.create_text(
+            x1 + 4, y1 + 3, text=f"{op_symbol}{cage['target']}", anchor="nw",
+            font=("Helvetica", max(6, min(9, self.cell_size // 6)), "bold"), fill="black")
+
+    def update_cage_colors(self, cage=None):
+        # a new cage only touches its own cells (and the borders they share)
+        if self.canvas is None:
+            return
+        if cage is None:
+            self.draw_grid()
+            return
+        self.cage_fill[id(cage)] = self.cage_colors[(len(self.grid_obj.get_cages()) - 1) % len(self.cage_colors)]
+        self.draw_cage_borders(cage['cells'])
+
+    def on_canvas_click(self, event):
+        # single in-place editor, moved to whichever cell is clicked
+        c = (event.x - 10) // self.cell_size
+        r = (event.y - 10) // self.cell_size
+        if not (0 <= r < self.size and 0 <= c < self.size):
+            return
+        self.commit_edit()
+        if self.editor is None:
+            self.editor = tk.Entry(self.canvas, justify='center', font=("Helvetica", 14),
+                                   borderwidth=1, highlightthickness=0)
+            self.editor.bind("<Return>", lambda e: self.commit_edit())
+            self.editor.bind("<Escape>", lambda e: self.close_editor())
+            self.editor.bind("<FocusOut>", lambda e: self.commit_edit())
+        x1, y1, _, _ = self.cell_bounds(r, c)
+        pad = self.cell_size // 4
+        self.editing = (r, c)
+        self.editor.delete(0, tk.END)
+        val = self.grid_obj.get_cell(r, c)
+        if val:
+            self.editor.insert(0, str(val))
+        self.editor.place(x=x1 + pad, y=y1 + pad, width=self.cell_size - 2 * pad, height=self.cell_size - 2 * pad)
+        self.editor.focus_set()
+
+    def commit_edit(self):
+        if self.editing is None:
+            return
+        r, c = self.editing
+        text = self.editor.get().strip()
+        try:
+            val = int(text) if text else 0
+        except ValueError:
+            val = -1
+        if 0 <= val <= self.size:
+            self.grid_obj.set_cell(r, c, val)
+            self.canvas.itemconfig(self.cell_texts[(r, c)], text=str(val) if val else "")
+        self.close_editor()
+
+    def close_editor(self):
+        self.editing = None
+        if self.editor is not None:
+            self.editor.place_forget()
 
     def fill_grid_from_gridobj(self):
         for r in range(self.size):
             for c in range(self.size):
-                self.cells[r][c].delete(0, tk.END)
                 val = self.grid_obj.get_cell(r, c)
-                if val != 0:
-                    self.cells[r][c].insert(0, str(val))
+                self.canvas.itemconfig(self.cell_texts[(r, c)], text=str(val) if val != 0 else "")
 
     def solve(self):
+        if self.solve_thread is not None and self.solve_thread.is_alive():
+            return
         algo = self.algo_var.get()
         # copy cages already in grid_obj
         if len(self.grid_obj.get_cages()) == 0:
@@ -332,28 +341,114 @@ class KenKenGUI:
             else:
                 return
 
-        # run selected algorithm and measure time
+        # run selected algorithm in a background thread on a copy of the puzzle;
+        # the Tk thread only polls self.solve_queue for progress and the result
+        self.cancel_event = threading.Event()
+        self.solve_target = self.grid_obj
+        self.solve_thread = threading.Thread(target=self.run_solver,
+                                             args=(algo, self.grid_obj.copy(), self.cancel_event, self.solve_queue),
+                                             daemon=True)
+        self.solve_button.config(state="disabled")
+        self.cancel_button.config(state="normal")
+        self.metrics_label.config(text=f"Solving with {algo}...")
+        self.solve_thread.start()
+        self.root.after(100, self.poll_solver)
+
+    def cancel_solve(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def run_solver(self, algo, grid_obj, cancel, out):
+        # worker thread: never touches Tk widgets, only posts messages to `out`
+        start = time.time()
+        last_post = [0.0]
+
+        def post_progress(text):
+            now = time.time()
+            if now - last_post[0] >= 0.1:
+                last_post[0] = now
+                out.put(("progress", text))
+
+        def search_progress(nodes, depth):
+            rate = nodes / max(time.time() - start, 1e-9)
+            post_progress(f"{algo}: {nodes} nodes | {rate:,.0f} nodes/s | depth {depth}")
+
+        def generation_progress(gen, best_fit):
+            post_progress(f"Cultural: generation {gen} | best fitness {best_fit}")
+
         try:
-            if algo == "Backtracking":
-                solved, t, iters = solve_backtracking(self.grid_obj)
-                if solved:
-                    self.fill_grid_from_gridobj()
-                    self.metrics_label.config(text=f"Solved by Backtracking | Time: {t:.3f}s | Iterations: {iters}")
+            if algo.startswith("Backtracking") or algo == "Dancing Links":
+                if algo == "Backtracking (MRV)":
+                    solved, t, iters = solve_backtracking_mrv(grid_obj, cancel=cancel, progress=search_progress)
+                elif algo == "Backtracking (MAC)":
+                    solved, t, iters = solve_backtracking_mrv(grid_obj, propagate=True, cancel=cancel,
+                                                              progress=search_progress)
+                elif algo == "Dancing Links":
+                    solved, t, iters = solve_dlx(grid_obj, cancel=cancel, progress=search_progress)
                 else:
-                    messagebox.showerror("Not solved", "Backtracking did not find a solution.")
-                    self.metrics_label.config(text=f"Backtracking finished | Time: {t:.3f}s | Iterations: {iters}")
+                    solved, t, iters = solve_backtracking(grid_obj, cancel=cancel, progress=search_progress)
+                out.put(("done", algo, solved, grid_obj.to_matrix() if solved else None, t, iters, None))
+            elif algo == "Portfolio":
+                solved, solution_grid, t, report = solve_portfolio(grid_obj, timeout_seconds=8.0, cancel=cancel)
+                out.put(("done", algo, solved, solution_grid.to_matrix() if solved else None, t, 0, report['winner']))
             else:
-                ca = CulturalAlgorithm(self.grid_obj, pop_size=200, elite_fraction=0.12, max_gen=1000)
-                solved, solution_grid, t, gens = ca.solve(timeout_seconds=8.0)
-                # if CA returns a grid (best found), apply it to GUI
-                if solution_grid is not None:
-                    self.grid_obj = solution_grid
-                    self.fill_grid_from_gridobj()
-                if solved:
-                    self.metrics_label.config(text=f"Solved by Cultural | Time: {t:.3f}s | Generations: {gens}")
-                else:
-                    self.metrics_label.config(text=f"Cultural finished (best-found) | Time: {t:.3f}s | Generations: {gens}")
-                    if not solved:
-                        messagebox.showinfo("Partial result", "Cultural algorithm did not find perfect solution; showing best found.")
+                ca = CulturalAlgorithm(grid_obj, pop_size=200, elite_fraction=0.12, max_gen=1000,
+                                       hybrid=algo == "Cultural (Hybrid)")
+                solved, solution_grid, t, gens = ca.solve(timeout_seconds=8.0, cancel=cancel,
+                                                          on_generation=generation_progress)
+                out.put(("done", algo, solved, solution_grid.to_matrix() if solution_grid is not None else None,
+                         t, gens, None))
         except Exception as e:
-            messagebox.showerror("Error", f"Solver error: {e}")
+            out.put(("error", str(e)))
+
+    def poll_solver(self):
+        finished = False
+        try:
+            while True:
+                msg = self.solve_queue.get_nowait()
+                if msg[0] == "progress":
+                    self.metrics_label.config(text=msg[1])
+                elif msg[0] == "error":
+                    finished = True
+                    messagebox.showerror("Error", f"Solver error: {msg[1]}")
+                else:
+                    finished = True
+                    self.show_result(*msg[1:])
+        except queue.Empty:
+            pass
+        if finished or not self.solve_thread.is_alive() and self.solve_queue.empty():
+            self.solve_button.config(state="normal")
+            self.cancel_button.config(state="disabled")
+        else:
+            self.root.after(100, self.poll_solver)
+
+    def show_result(self, algo, solved, matrix, t, count, winner):
+        cancelled = self.cancel_event is not None and self.cancel_event.is_set()
+        if self.solve_target is not self.grid_obj:
+            # puzzle was reset while solving; the result no longer applies
+            return
+        if matrix is not None:
+            self.grid_obj.from_matrix(matrix)
+            self.fill_grid_from_gridobj()
+        if algo.startswith("Cultural"):
+            if solved:
+                self.metrics_label.config(text=f"Solved by {algo} | Time: {t:.3f}s | Generations: {count}")
+            else:
+                status = "cancelled" if cancelled else "best-found"
+                self.metrics_label.config(text=f"{algo} finished ({status}) | Time: {t:.3f}s | Generations: {count}")
+                if not cancelled:
+                    messagebox.showinfo("Partial result", "Cultural algorithm did not find perfect solution; showing best found.")
+        elif algo == "Portfolio":
+            if solved:
+                self.metrics_label.config(text=f"Solved by Portfolio ({winner}) | Time: {t:.3f}s")
+            else:
+                self.metrics_label.config(text=f"Portfolio {'cancelled' if cancelled else 'finished'} | Time: {t:.3f}s")
+                if not cancelled:
+                    messagebox.showerror("Not solved", "No portfolio strategy found a solution.")
+        else:
+            if solved:
+                self.metrics_label.config(text=f"Solved by {algo} | Time: {t:.3f}s | Iterations: {count}")
+            else:
+                self.metrics_label.config(text=f"{algo} {'cancelled' if cancelled else 'finished'} | Time: {t:.3f}s | Iterations: {count}")
+                if not cancelled:
+                    messagebox.showerror("Not solved", f"{algo} did not find a solution.")
@@ -0,0 +1,119 @@
+import os
+import queue
+import random
+import time
+import multiprocessing as mp
+from typing import Optional
+from grid import KenKenGrid
+from cultural import CulturalAlgorithm
+
+# Island model: K CulturalAlgorithm populations evolve in separate processes,
+# each with its own belief space. Every `migration_interval` generations an
+# island sends copies of its elites and its belief matrix to the next island
+# on a ring; the receiver swaps them in for its worst individuals and
+# averages the two belief spaces. The first island to reach fitness 0 sets a
+# shared stop event that ends the run on all islands.
+
+def _island_worker(island_id: int, grid_obj: KenKenGrid, params: dict, seed: Optional[int],
+                   inbox, outbox, results, stop, timeout_seconds: float,
+                   migration_interval: int, migrants: int):
+    # never block process exit on migrants nobody will read
+    outbox.cancel_join_thread()
+    random.seed(seed)
+    start = time.time()
+    ca = CulturalAlgorithm(grid_obj, **params)
+    ca.population = [ca.random_individual() for _ in range(ca.pop_size)]
+    best = None
+    best_fit = float('inf')
+    gens = 0
+
+    for gen in range(ca.max_gen):
+        if stop.is_set():
+            break
+        scored = ca.evaluate()
+        gens += 1
+        if scored[0][0] < best_fit:
+            best_fit = scored[0][0]
+            best = [row[:] for row in scored[0][1]]
+        if best_fit == 0:
+            stop.set()
+            break
+
+        if (gen + 1) % migration_interval == 0:
+            elites = [[row[:] for row in g] for _, g in scored[:migrants]]
+            belief = ca.belief_copy()
+            outbox.put((elites, belief))
+        try:
+            while True:
+                incoming, belief = inbox.get_nowait()
+                # migrants are scored once here and carry their counts from then on;
+                # they replace the worst individuals
+                incoming = [ca.as_individual(g) for g in incoming]
+                scored = scored[:len(scored) - len(incoming)] + [(ind.fit, ind) for ind in incoming]
+                scored.sort(key=lambda x: x[0])
+                ca.merge_belief(belief)
+        except queue.Empty:
+            pass
+
+        ca.next_generation(scored)
+        if time.time() - start > timeout_seconds:
+            break
+
+    results.put((island_id, best_fit == 0, best, best_fit, gens))
+
+def solve_islands(grid_obj: KenKenGrid, islands: Optional[int] = None, pop_size: int = 200,
+                  elite_fraction: float = 0.1, max_gen: int = 1000, timeout_seconds: float = 5.0,
+                  migration_interval: int = 20, migrants: int = 5, seed: Optional[int] = None):
+    """Run the Cultural Algorithm as an island model across worker processes.
+
+    Returns the same (solved, grid, time, generations) tuple as
+    CulturalAlgorithm.solve; generations is the total over all islands.
+    """
+    start = time.time()
+    k = islands or os.cpu_count() or 1
+    params = {'pop_size': pop_size, 'elite_fraction': elite_fraction, 'max_gen': max_gen}
+    inboxes = [mp.Queue() for _ in range(k)]
+    results = mp.Queue()
+    stop = mp.Event()
+    procs = []
+    for i in range(k):
+        island_seed = None if seed is None else seed + i
+        p = mp.Process(target=_island_worker,
+                       args=(i, grid_obj, params, island_seed, inboxes[i], inboxes[(i + 1) % k],
+                             results, stop, timeout_seconds, max(1, migration_interval), migrants),
+                       daemon=True)
+        p.start()
+        procs.append(p)
+
+    best = None
+    best_fit = float('inf')
+    total_gens = 0
+    pending = k
+    # grace period on top of the time budget for the last generation to finish
+    deadline = start + timeout_seconds + 5.0
+    while pending:
+        try:
+            _, solved, grid, fit, gens = results.get(timeout=max(0.0, deadline - time.time()))
+        except queue.Empty:
+            break
+        pending -= 1
+        total_gens += gens
+        if grid is not None and fit < best_fit:
+            best, best_fit = grid, fit
+        if solved:
+            stop.set()
+
+    stop.set()
+    for p in procs:
+        p.join(timeout=1.0)
+        if p.is_alive():
+            p.terminate()
+    for q in inboxes:
+        q.cancel_join_thread()
+
+    end = time.time()
+    if best is None:
+        return False, None, end - start, total_gens
+    out_grid = KenKenGrid(grid_obj.n)
+    out_grid.from_matrix(best)
+    return best_fit == 0, out_grid, end - start, total_gens
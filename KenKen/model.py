@@ -0,0 +1,96 @@
+from typing import List, Tuple, Callable, Any
+from grid import KenKenGrid, Cell
+from cage_tables import cage_fillings, Filling
+from constraints import product_table, pair_partners
+
+# Compiled puzzle model.
+#
+# compile_model() turns a KenKenGrid's cage dicts into a read-only structure
+# the solvers can use without string or dict lookups: every cell is a flat
+# index r*N + c, each cell knows its cage index, and each cage carries a
+# feasibility function picked once from its operation.
+# Everything is tuples, slots and module-level functions, so a model pickles
+# cheaply and a process pool can ship it to each worker once.
+#
+# Feasibility functions take (aggregates, k, val) and answer whether `val`
+# can be added to cage k given the running totals in `aggregates` (see
+# backtracking.CageAggregates): its targets, sizes, sums, prods, filled,
+# mins, maxs, n and, per cage, the lookup table from constraints.py that the
+# cage was compiled with (product_table for '*', pair_partners for '-'/'/').
+
+def sum_bounded(agg, k: int, val: int) -> bool:
+    # the remaining cells must be able to make up the rest of the sum
+    left = agg.sizes[k] - agg.filled[k] - 1
+    s = agg.sums[k] + val
+    return s + left <= agg.targets[k] <= s + left * agg.n
+
+def product_divisor(agg, k: int, val: int) -> bool:
+    # the partial product must divide the target and the cells left must be
+    # able to make up the quotient
+    p = agg.prods[k] * val
+    target = agg.targets[k]
+    if target % p:
+        return False
+    return target // p in agg.tables[k][agg.sizes[k] - agg.filled[k] - 1]
+
+def partner_pair(agg, k: int, val: int) -> bool:
+    # '-' and '/' pairs: val needs a partner, and must be the partner of the
+    # value already placed
+    partners = agg.tables[k]
+    if agg.filled[k] == 0:
+        return partners[val] != 0
+    return (partners[val] >> (agg.maxs[k] - 1)) & 1 == 1
+
+def fixed(agg, k: int, val: int) -> bool:
+    return val == agg.targets[k]
+
+def never(agg, k: int, val: int) -> bool:
+    # malformed cage ('-' or '/' over other than two cells, unknown op)
+    return False
+
+Feasibility = Callable[..., bool]
+
+def choose_feasibility(op: str, size: int, target: int, n: int) -> Tuple[Feasibility, Any]:
+    # (function, lookup table) for a cage
+    if op == '+':
+        return sum_bounded, None
+    if op == '*' and target > 0:
+        return product_divisor, product_table(target, size, n)
+    if op in ('-', '/') and size == 2:
+        return partner_pair, pair_partners(op, target, n)
+    if op == '=':
+        return fixed, None
+    return never, None
+
+class CompiledCage:
+    """One cage, compiled; treat as immutable."""
+    __slots__ = ('index', 'cells', 'coords', 'op', 'target', 'size', 'feasible', 'table', 'fillings')
+
+    def __init__(self, index: int, coords: List[Cell], op: str, target: int, n: int):
+        self.index = index
+        self.coords: Tuple[Cell, ...] = tuple(coords)
+        self.cells: Tuple[int, ...] = tuple(r * n + c for r, c in coords)
+        self.op = op
+        self.target = target
+        self.size = len(coords)
+        self.feasible, self.table = choose_feasibility(op, self.size, target, n)
+        self.fillings: Tuple[Filling, ...] = cage_fillings({'cells': self.coords, 'op': op, 'target': target}, n)
+
+class CompiledModel:
+    """Solver-ready view of a puzzle's constraints (givens are not part of it)."""
+    __slots__ = ('n', 'cages', 'cell_cage')
+
+    def __init__(self, n: int, cages: Tuple[CompiledCage, ...]):
+        self.n = n
+        self.cages = cages
+        cell_cage = [-1] * (n * n)
+        for cage in cages:
+            for i in cage.cells:
+                cell_cage[i] = cage.index
+        self.cell_cage: Tuple[int, ...] = tuple(cell_cage)
+
+def compile_model(grid_obj: KenKenGrid) -> CompiledModel:
+    n = grid_obj.n
+    cages = tuple(CompiledCage(k, cage['cells'], cage['op'], cage['target'], n)
+                  for k, cage in enumerate(grid_obj.get_cages()))
+    return CompiledModel(n, cages)
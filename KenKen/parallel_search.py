@@ -0,0 +1,158 @@
+import os
+import queue
+import time
+import multiprocessing as mp
+from typing import List, Tuple, Optional
+from grid import KenKenGrid
+from backtracking import BitmaskSearch
+from model import CompiledModel, compile_model
+
+# The search tree is split at `split_depth` into independent subproblems, each
+# a (grid, domains) snapshot, and handed to worker processes through a shared
+# queue. While any worker is idle, busy workers donate the untried values of
+# the node they are on as a new subproblem (work stealing), so the load keeps
+# balancing as the tree unfolds. `pending` counts subproblems queued or in
+# progress; the run is over when it drops to zero or a stop is requested.
+# The puzzle is compiled once and each worker receives the compiled model at
+# start-up, so tasks carry only the grid and domain snapshots.
+
+Task = Tuple[List[List[int]], List[List[int]]]
+
+class _StealHook:
+    """Connects a worker's BitmaskSearch to the shared task queue."""
+
+    def __init__(self, tasks, pending, idle, stop, total, limit: Optional[int], check_every: int = 64):
+        self.tasks = tasks
+        self.pending = pending
+        self.idle = idle
+        self.stop = stop
+        self.total = total
+        self.limit = limit
+        self.check_every = check_every
+        self.counter = 0
+        self.donated = 0
+
+    def on_node(self, engine: BitmaskSearch) -> bool:
+        # cheap most of the time; poll shared state every `check_every` nodes
+        self.counter += 1
+        if self.counter % self.check_every:
+            return False
+        if self.stop.is_set():
+            return True
+        return self.limit is not None and self.total.value + engine.solutions_found >= self.limit
+
+    def donate(self, engine: BitmaskSearch, r: int, c: int, values: List[int]) -> bool:
+        if self.counter % self.check_every or self.idle.value <= 0:
+            return False
+        grid, domains = engine.snapshot()
+        mask = 0
+        for v in values:
+            mask |= 1 << (v - 1)
+        domains[r][c] &= mask
+        with self.pending.get_lock():
+            self.pending.value += 1
+        self.tasks.put((grid, domains))
+        self.donated += 1
+        return True
+
+def _worker(grid_obj: KenKenGrid, model: CompiledModel, count_mode: bool, limit: Optional[int], propagate: bool,
+            tasks, pending, idle, stop, total, results):
+    hook = _StealHook(tasks, pending, idle, stop, total, limit)
+    found = 0
+    nodes = 0
+    first = None
+    waiting = False
+    while not stop.is_set():
+        try:
+            grid, domains = tasks.get(timeout=0.05)
+        except queue.Empty:
+            if pending.value == 0:
+                break
+            if not waiting:
+                waiting = True
+                with idle.get_lock():
+                    idle.value += 1
+            continue
+        if waiting:
+            waiting = False
+            with idle.get_lock():
+                idle.value -= 1
+        sub = grid_obj.copy()
+        sub.from_matrix(grid)
+        max_solutions = (limit or float('inf')) if count_mode else 1
+        engine = BitmaskSearch(sub, max_solutions, use_propagation=propagate, model=model)
+        engine.hook = hook
+        engine.run(domains)
+        nodes += engine.iterations
+        if engine.solutions_found:
+            found += engine.solutions_found
+            with total.get_lock():
+                total.value += engine.solutions_found
+            if first is None and not count_mode:
+                first = sub.to_matrix()
+            if not count_mode or (limit is not None and total.value >= limit):
+                stop.set()
+        with pending.get_lock():
+            pending.value -= 1
+    if waiting:
+        with idle.get_lock():
+            idle.value -= 1
+    results.put((found, first, nodes, hook.donated))
+
+def _run_parallel(grid_obj: KenKenGrid, count_mode: bool, limit: Optional[int], workers: Optional[int],
+                  split_depth: int, propagate: bool):
+    workers = max(1, workers or os.cpu_count() or 1)
+    model = compile_model(grid_obj)
+    root = BitmaskSearch(grid_obj.copy(), use_propagation=propagate, model=model)
+    if not root.init_domains():
+        return 0, None, root.iterations, 0
+    initial = root.split(split_depth)
+    tasks = mp.Queue()
+    pending = mp.Value('i', len(initial))
+    idle = mp.Value('i', 0)
+    total = mp.Value('i', 0)
+    stop = mp.Event()
+    results = mp.Queue()
+    for task in initial:
+        tasks.put(task)
+    procs = [mp.Process(target=_worker,
+                        args=(grid_obj, model, count_mode, limit, propagate, tasks, pending, idle, stop, total, results),
+                        daemon=True)
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    found = 0
+    first = None
+    nodes = root.iterations
+    donated = 0
+    for _ in procs:
+        f, sol, k, d = results.get()
+        found += f
+        nodes += k
+        donated += d
+        if first is None:
+            first = sol
+    for p in procs:
+        p.join()
+    tasks.cancel_join_thread()
+    if limit is not None:
+        found = min(found, limit)
+    return found, first, nodes, donated
+
+def solve_parallel(grid_obj: KenKenGrid, workers: Optional[int] = None, split_depth: int = 2,
+                   propagate: bool = True) -> Tuple[bool, float, int]:
+    """First-solution parallel MRV search; same (solved, time, iterations) contract as solve_backtracking."""
+    start = time.time()
+    found, first, nodes, _ = _run_parallel(grid_obj, False, 1, workers, split_depth, propagate)
+    if first is not None:
+        grid_obj.from_matrix(first)
+    end = time.time()
+    return (found > 0, end-start, nodes)
+
+def count_solutions_parallel(grid_obj: KenKenGrid, limit: Optional[int] = None, workers: Optional[int] = None,
+                             split_depth: int = 3, propagate: bool = True) -> Tuple[int, float, int]:
+    """Exhaustive (or `limit`-bounded) solution count across worker processes: (count, time, iterations)."""
+    start = time.time()
+    found, _, nodes, _ = _run_parallel(grid_obj, True, limit, workers, split_depth, propagate)
+    end = time.time()
+    return (found, end-start, nodes)
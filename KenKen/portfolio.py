@@ -0,0 +1,127 @@
+import os
+import queue
+import random
+import time
+import multiprocessing as mp
+from typing import List, Tuple, Optional, Dict, Any
+from grid import KenKenGrid
+from backtracking import solve_backtracking, solve_backtracking_mrv
+from cultural import CulturalAlgorithm
+from dlx import solve_dlx
+
+Strategy = Tuple[str, str, Dict[str, Any]]  # (name, engine, options)
+
+# Engines: 'backtracking', 'mrv' (options: propagate, value_order, seed),
+# 'dlx', 'cultural' (options: seed, pop_size, elite_fraction, max_gen, hybrid).
+DEFAULT_PORTFOLIO: List[Strategy] = [
+    ('mrv', 'mrv', {}),
+    ('mrv-desc', 'mrv', {'value_order': 'descending'}),
+    ('mac', 'mrv', {'propagate': True}),
+    ('mac-random', 'mrv', {'propagate': True, 'value_order': 'random', 'seed': 1}),
+    ('dlx', 'dlx', {}),
+    ('cultural-s1', 'cultural', {'seed': 1}),
+    ('cultural-s2', 'cultural', {'seed': 2}),
+    ('cultural-hybrid', 'cultural', {'seed': 1, 'hybrid': True}),
+]
+
+def run_strategy(engine: str, options: Dict[str, Any], grid_obj: KenKenGrid,
+                 timeout_seconds: float, cancel=None) -> Tuple[bool, Optional[List[List[int]]], int]:
+    # (proven solution found, solution matrix, iterations or generations)
+    if engine == 'backtracking':
+        solved, _, iters = solve_backtracking(grid_obj, cancel=cancel)
+    elif engine == 'mrv':
+        solved, _, iters = solve_backtracking_mrv(grid_obj, timeout_seconds=timeout_seconds, cancel=cancel, **options)
+    elif engine == 'dlx':
+        solved, _, iters = solve_dlx(grid_obj, cancel=cancel)
+    elif engine == 'cultural':
+        opts = dict(options)
+        random.seed(opts.pop('seed', None))
+        ca = CulturalAlgorithm(grid_obj, **opts)
+        solved, out_grid, _, iters = ca.solve(timeout_seconds=timeout_seconds, cancel=cancel)
+        return solved, out_grid.to_matrix() if solved else None, iters
+    else:
+        raise ValueError(f"Unknown engine {engine!r}")
+    return solved, grid_obj.to_matrix() if solved else None, iters
+
+def _strategy_worker(index: int, engine: str, options: Dict[str, Any], grid_obj: KenKenGrid,
+                     timeout_seconds: float, results):
+    try:
+        solved, matrix, iters = run_strategy(engine, options, grid_obj, timeout_seconds)
+        results.put((index, solved, matrix, iters, None))
+    except Exception as e:
+        results.put((index, False, None, 0, str(e)))
+
+def solve_portfolio(grid_obj: KenKenGrid, strategies: Optional[List[Strategy]] = None,
+                    workers: Optional[int] = None, timeout_seconds: float = 10.0, cancel=None):
+    """Race several solver configurations in worker processes on the same puzzle.
+
+    The first strategy that proves a solution wins and the others are
+    cancelled. Returns (solved, grid, time, report) where report holds the
+    winner's name and, per strategy, its status, run time and iterations.
+    """
+    start = time.time()
+    strategies = DEFAULT_PORTFOLIO if strategies is None else strategies
+    workers = max(1, min(workers or os.cpu_count() or 1, len(strategies)))
+    results = mp.Queue()
+    runs = [{'name': name, 'engine': engine, 'status': 'not started', 'time': 0.0, 'iterations': 0}
+            for name, engine, _ in strategies]
+    started: Dict[int, Tuple[Any, float]] = {}  # index -> (process, start time)
+    next_index = 0
+    winner: Optional[int] = None
+    solution: Optional[List[List[int]]] = None
+    deadline = start + timeout_seconds
+
+    def launch():
+        nonlocal next_index
+        while next_index < len(strategies) and len(started) < workers:
+            name, engine, options = strategies[next_index]
+            p = mp.Process(target=_strategy_worker,
+                           args=(next_index, engine, options, grid_obj.copy(), timeout_seconds, results),
+                           daemon=True)
+            p.start()
+            started[next_index] = (p, time.time())
+            runs[next_index]['status'] = 'running'
+            next_index += 1
+
+    launch()
+    while started and winner is None:
+        if cancel is not None and cancel.is_set():
+            break
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            # short waits so a cancel request is noticed quickly
+            index, solved, matrix, iters, error = results.get(timeout=min(remaining, 0.1))
+        except queue.Empty:
+            continue
+        p, t0 = started.pop(index)
+        p.join()
+        runs[index]['time'] = time.time() - t0
+        runs[index]['iterations'] = iters
+        if error is not None:
+            runs[index]['status'] = f'error: {error}'
+        elif solved:
+            runs[index]['status'] = 'solved'
+            winner, solution = index, matrix
+        else:
+            runs[index]['status'] = 'failed'
+        if winner is None:
+            launch()
+
+    # cancel whatever is still running
+    for index, (p, t0) in started.items():
+        p.terminate()
+        p.join()
+        runs[index]['time'] = time.time() - t0
+        cancelled = winner is not None or (cancel is not None and cancel.is_set())
+        runs[index]['status'] = 'cancelled' if cancelled else 'timeout'
+    results.cancel_join_thread()
+
+    end = time.time()
+    report = {'winner': None if winner is None else strategies[winner][0], 'strategies': runs}
+    if solution is None:
+        return False, None, end - start, report
+    out_grid = grid_obj.copy()
+    out_grid.from_matrix(solution)
+    return True, out_grid, end - start, report
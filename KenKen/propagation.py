@@ -0,0 +1,136 @@
+from collections import deque
+from functools import lru_cache
+from typing import List, Tuple, Optional, Callable, Iterable, Sequence
+from grid import KenKenGrid, Cell
+from cage_tables import cage_fillings, narrow_cage, Filling
+
+Domains = List[List[int]]  # candidate bitmask per cell, bit v-1 for value v
+
+def popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+def initial_domains(grid_obj: KenKenGrid) -> Domains:
+    # givens become singletons, empty cells start with every value
+    n = grid_obj.n
+    full = (1 << n) - 1
+    return [[(1 << (v - 1)) if v else full for v in row] for row in grid_obj.grid]
+
+@lru_cache(maxsize=None)
+def line_cells(n: int) -> Tuple[Tuple[Cell, ...], ...]:
+    # rows 0..n-1, then columns as n..2n-1
+    return tuple(tuple((r, c) for c in range(n)) for r in range(n)) + \
+        tuple(tuple((r, c) for r in range(n)) for c in range(n))
+
+def propagate(grid_obj: KenKenGrid, domains: Domains,
+              restrict: Optional[Callable[[int, int, int], None]] = None,
+              fillings: Optional[List[Tuple[Filling, ...]]] = None,
+              changed: Optional[Iterable[Cell]] = None,
+              cell_cage: Optional[Sequence[int]] = None) -> Tuple[bool, int]:
+    """Prune `domains` in place to a fixpoint.
+
+    Enforces all-different on rows and columns (naked and hidden singles) and
+    generalized arc consistency on every cage through its filling table.
+    Constraints are revised from a worklist (AC-3 style): only the rows,
+    columns and cages over a cell in `changed` (cells whose mask changed
+    since the last fixpoint; None = all) are queued, and every pruned cell
+    queues the constraints over it again. `cell_cage` (flat cell index ->
+    cage index or -1) is derived from the grid when not given.
+    `restrict(r, c, mask)` is called for every change so a search can record
+    it on its undo trail. Returns (consistent, number of values pruned).
+    """
+    n = grid_obj.n
+    cages = grid_obj.get_cages()
+    if fillings is None:
+        fillings = [cage_fillings(cage, n) for cage in cages]
+    if cell_cage is None:
+        cell_cage = [-1] * (n * n)
+        for k, cage in enumerate(cages):
+            for (r, c) in cage['cells']:
+                cell_cage[r * n + c] = k
+    lines = line_cells(n)
+    pruned = 0
+    # constraint ids: rows 0..n-1, columns n..2n-1, cage k is 2n+k
+    queue: deque = deque()
+    queued = bytearray(2 * n + len(cages))
+
+    def touch(r: int, c: int):
+        k = cell_cage[r * n + c]
+        for x in (r, n + c, 2 * n + k if k >= 0 else -1):
+            if x >= 0 and not queued[x]:
+                queued[x] = 1
+                queue.append(x)
+
+    def set_mask(r: int, c: int, mask: int):
+        nonlocal pruned
+        pruned += popcount(domains[r][c] & ~mask)
+        if restrict is not None:
+            restrict(r, c, mask)
+        else:
+            domains[r][c] = mask
+        touch(r, c)
+
+    if changed is None:
+        queue.extend(range(len(queued)))
+        queued[:] = b'\x01' * len(queued)
+    else:
+        for (r, c) in changed:
+            touch(r, c)
+
+    while queue:
+        x = queue.popleft()
+        if x >= 2 * n:
+            # generalized arc consistency on a cage; narrowing is idempotent, so
+            # the cage stays marked while its own changes are applied
+            cells = cages[x - 2 * n]['cells']
+            masks = [domains[r][c] for (r, c) in cells]
+            support = narrow_cage(fillings[x - 2 * n], masks)
+            for (r, c), mask, keep in zip(cells, masks, support):
+                if keep == 0:
+                    return False, pruned
+                if keep != mask:
+                    set_mask(r, c, keep)
+            queued[x] = 0
+            continue
+        # a line may need another pass after its own singles, so unmark first
+        queued[x] = 0
+        line = lines[x]
+        # naked singles: a decided cell removes its value from the line
+        decided = 0
+        for (r, c) in line:
+            mask = domains[r][c]
+            if mask & (mask - 1) == 0:
+                if mask & decided:
+                    return False, pruned
+                decided |= mask
+        for (r, c) in line:
+            mask = domains[r][c]
+            if mask & (mask - 1) and mask & decided:
+                set_mask(r, c, mask & ~decided)
+                if domains[r][c] == 0:
+                    return False, pruned
+        # hidden singles: a value with a single place left in the line goes there
+        seen_once = 0
+        seen_more = 0
+        for (r, c) in line:
+            mask = domains[r][c]
+            seen_more |= seen_once & mask
+            seen_once |= mask
+        if seen_once != (1 << n) - 1:
+            return False, pruned
+        only = seen_once & ~seen_more
+        if only:
+            for (r, c) in line:
+                mask = domains[r][c]
+                hit = mask & only
+                if hit and mask != hit:
+                    if hit & (hit - 1):
+                        # two values can only go in this one cell
+                        return False, pruned
+                    set_mask(r, c, hit)
+    return True, pruned
+
+def reduce_grid(grid_obj: KenKenGrid) -> Tuple[bool, Domains, int]:
+    """One propagation pass before search: (consistent, domains, values pruned)."""
+    domains = initial_domains(grid_obj)
+    ok, pruned = propagate(grid_obj, domains)
+    return ok, domains, pruned
@@ -0,0 +1,83 @@
+from typing import List, Dict, Any, Optional
+from grid import Cell, Cage
+from constraints import check_cage_for_cell
+
+# Search instrumentation.
+#
+# Solvers take an optional `stats` object and only touch it behind an
+# `if stats is not None` test, so a run without stats pays for nothing but
+# that test. Subclass SearchStats and override node/backtrack/fail/prune to
+# trace events as they happen instead of (or as well as) counting them.
+
+class SearchStats:
+    """Counters collected during one or more solver runs.
+
+    check_time is the time spent testing candidate values against the
+    constraints (forward checking and propagation included for the MRV
+    engine, fitness evaluation for the Cultural Algorithm); total_time is
+    the whole run, so the difference is the cost of the search itself.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.failures: Dict[str, int] = {}  # 'row', 'column', 'cage+', 'cage*', ..., 'propagation'
+        self.pruned = 0
+        self.max_depth = 0
+        self.check_time = 0.0
+        self.total_time = 0.0
+        self.generations = 0
+
+    def node(self, depth: int):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def backtrack(self, depth: int):
+        self.backtracks += 1
+
+    def fail(self, kind: str):
+        self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def prune(self, count: int):
+        self.pruned += count
+
+    @property
+    def search_time(self) -> float:
+        return max(0.0, self.total_time - self.check_time)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'failures': dict(self.failures),
+            'pruned': self.pruned,
+            'max_depth': self.max_depth,
+            'check_time': self.check_time,
+            'search_time': self.search_time,
+            'total_time': self.total_time,
+            'generations': self.generations,
+        }
+
+    def report(self) -> str:
+        lines = [f"nodes: {self.nodes}  backtracks: {self.backtracks}  max depth: {self.max_depth}  "
+                 f"pruned: {self.pruned}"]
+        if self.generations:
+            lines.append(f"generations: {self.generations}")
+        if self.failures:
+            lines.append("failures: " + ", ".join(f"{k} {v}" for k, v in sorted(self.failures.items())))
+        share = self.check_time / self.total_time if self.total_time > 0 else 0.0
+        lines.append(f"time: {self.total_time:.4f}s total, {self.check_time:.4f}s in checks ({share:.0%}), "
+                     f"{self.search_time:.4f}s search")
+        return "\n".join(lines)
+
+def failure_kind(grid: List[List[int]], cell_to_cage: Dict[Cell, Cage], r: int, c: int, value: int) -> str:
+    # which constraint rejects `value` at (r, c); only called once a check has failed
+    if value in grid[r]:
+        return 'row'
+    if any(grid[i][c] == value for i in range(len(grid))):
+        return 'column'
+    cage: Optional[Cage] = cell_to_cage.get((r, c))
+    if cage is not None and not check_cage_for_cell(grid, cage, r, c, value):
+        return 'cage' + cage['op']
+    return 'other'
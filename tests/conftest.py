@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules in KenKen/ import each other by bare name (from grid import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'KenKen'))
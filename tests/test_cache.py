@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from grid import KenKenGrid
+from generator import generate_puzzle
+from cache import SolutionCache, transform_cell, transform_matrix, inverse_matrix, fingerprint
+
+def transformed_puzzle(grid_obj: KenKenGrid, t: int, rng: random.Random) -> KenKenGrid:
+    # the same puzzle under symmetry t, with its cages listed in another order
+    n = grid_obj.n
+    cages = list(grid_obj.get_cages())
+    rng.shuffle(cages)
+    out = KenKenGrid(n)
+    for cage in cages:
+        out.add_cage([transform_cell(t, r, c, n) for r, c in cage['cells']], cage['op'], cage['target'])
+    return out
+
+@pytest.mark.parametrize('t', range(8))
+def test_inverse_undoes_transform(t):
+    rng = random.Random(t)
+    mat = [[rng.randrange(100) for _ in range(5)] for _ in range(5)]
+    assert inverse_matrix(t, transform_matrix(t, mat)) == mat
+
+def test_the_eight_symmetries_are_distinct():
+    mat = [[r * 4 + c for c in range(4)] for r in range(4)]
+    images = {tuple(map(tuple, transform_matrix(t, mat))) for t in range(8)}
+    assert len(images) == 8
+
+@pytest.mark.parametrize('t', range(8))
+def test_hit_is_mapped_back_onto_the_symmetric_puzzle(t):
+    grid_obj, solution, _ = generate_puzzle(5, seed=4)
+    image = transformed_puzzle(grid_obj, t, random.Random(t))
+    assert fingerprint(image)[0] == fingerprint(grid_obj)[0]
+    cache = SolutionCache()
+    cache.put(grid_obj, solution)
+    assert cache.get(image) == transform_matrix(t, solution)
+
+def test_disk_cache_survives_reopen_and_stays_bounded(tmp_path):
+    path = str(tmp_path / 'solutions.sqlite')
+    puzzles = [generate_puzzle(4, seed=s)[:2] for s in range(6)]
+    cache = SolutionCache(capacity=1, path=path, disk_entries=4)
+    for grid_obj, solution in puzzles:
+        cache.put(grid_obj, solution)
+    cache.close()
+    cache = SolutionCache(capacity=1, path=path, disk_entries=4)
+    assert cache.disk_count <= 4
+    grid_obj, solution = puzzles[-1]
+    assert cache.get(grid_obj) == solution
+    assert cache.disk_hits == 1
+    cache.close()
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from cage_tables import cage_fillings, narrow_cage
+
+def narrow_by_scan(fillings, masks):
+    # the straightforward definition narrow_cage must match
+    support = [0] * len(masks)
+    for f in fillings:
+        if all(mask >> (v - 1) & 1 for v, mask in zip(f, masks)):
+            for i, v in enumerate(f):
+                support[i] |= 1 << (v - 1)
+    return support
+
+CAGES = [
+    ({'cells': [(0, 0), (0, 1)], 'op': '-', 'target': 2}, 6),
+    ({'cells': [(0, 0), (1, 0)], 'op': '/', 'target': 2}, 8),
+    ({'cells': [(0, 0), (0, 1), (1, 0)], 'op': '+', 'target': 12}, 6),
+    ({'cells': [(0, 0), (0, 1), (1, 1), (1, 2)], 'op': '*', 'target': 120}, 7),
+    ({'cells': [(0, 0), (0, 1), (0, 2), (1, 0), (2, 0)], 'op': '+', 'target': 25}, 9),
+]
+
+@pytest.mark.parametrize('cage,n', CAGES)
+def test_narrow_cage_matches_a_filling_scan(cage, n):
+    fillings = cage_fillings(cage, n)
+    assert fillings
+    rng = random.Random(n)
+    full = (1 << n) - 1
+    for _ in range(300):
+        # mostly wide domains with a few singletons, as during search
+        masks = [full if rng.random() < 0.4 else rng.randrange(1, full + 1) for _ in cage['cells']]
+        if rng.random() < 0.3:
+            masks[rng.randrange(len(masks))] = 1 << rng.randrange(n)
+        assert narrow_cage(fillings, masks) == narrow_by_scan(fillings, masks)
+
+def test_no_fillings_clears_every_cell():
+    assert narrow_cage((), [0b111, 0b101]) == [0, 0]
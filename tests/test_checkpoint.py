@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from grid import KenKenGrid
+from backtracking import BitmaskSearch, count_solutions
+
+# A 6x6 grid with only its first few cages: under-constrained on purpose so the
+# search has to enumerate a large, known number of solutions.
+PARTIAL_CAGES = [
+    '0,0,1,0,2,0;*;8',
+    '0,1,1,1,0,2;*;40',
+    '0,3,1,3;*;18',
+    '0,4,0,5;+;4',
+    '1,2;=;6',
+    '1,4;=;5',
+]
+PARTIAL_COUNT = 12768
+
+def partial_grid() -> KenKenGrid:
+    return KenKenGrid.from_dict({'n': 6, 'cages': PARTIAL_CAGES})
+
+@pytest.mark.parametrize('propagation,order', [(True, 'random'), (False, 'ascending')])
+def test_resume_from_json_checkpoints_counts_every_solution(propagation, order):
+    grid_obj = partial_grid()
+    engine = BitmaskSearch(grid_obj.copy(), 10 ** 9, use_propagation=propagation,
+                           value_order=order, seed=5, node_limit=5000)
+    engine.run()
+    hops = 0
+    while engine.status == 'node_limit':
+        state = json.loads(json.dumps(engine.save_state()))
+        engine = BitmaskSearch.from_state(grid_obj.copy(), state, node_limit=state['iterations'] + 5000)
+        engine.resume()
+        hops += 1
+    assert hops > 0
+    assert engine.status == 'exhausted'
+    assert engine.solutions_found == PARTIAL_COUNT
+
+def test_uninterrupted_count_matches():
+    count, _ = count_solutions(partial_grid(), limit=10 ** 9)
+    assert count == PARTIAL_COUNT
@@ -0,0 +1,49 @@
+import pytest
+
+from compact import CompactGrid, pack_matrix, unpack_matrix
+from generator import generate_puzzle
+from backtracking import solve_backtracking, solve_backtracking_mrv, count_solutions
+from dlx import solve_dlx
+
+def test_views_round_trip():
+    cg = CompactGrid(4)
+    mat = [[(r + c) % 4 + 1 for c in range(4)] for r in range(4)]
+    for r, row in enumerate(mat):
+        cg.grid[r][:] = row
+    assert cg.to_matrix() == mat
+    assert [row[:] for row in cg.grid] == mat
+    assert cg.grid[1][1:3] == mat[1][1:3]
+    assert cg.grid[-1][::-1] == mat[-1][::-1]
+    assert [list(row) for row in cg.grid[1:3]] == mat[1:3]
+    cg.grid[2][-1] = 9
+    assert cg.get_cell(2, 3) == 9
+
+def test_row_slice_assignment_keeps_length():
+    cg = CompactGrid(3)
+    with pytest.raises(ValueError):
+        cg.grid[0][0:2] = [1]
+    with pytest.raises(IndexError):
+        cg.grid[0][3]
+
+def test_snapshot_and_pack_round_trip():
+    grid_obj, solution, _ = generate_puzzle(5, seed=1)
+    cg = CompactGrid.from_grid(grid_obj)
+    snap = cg.snapshot()
+    cg.from_matrix(solution)
+    assert cg.is_complete()
+    cg.restore(snap)
+    assert cg.to_matrix() == grid_obj.to_matrix()
+    assert unpack_matrix(pack_matrix(solution), 5) == solution
+    assert cg.to_grid().to_dict() == grid_obj.to_dict()
+
+@pytest.mark.parametrize('solver', [solve_backtracking, solve_backtracking_mrv, solve_dlx])
+def test_solvers_accept_a_compact_grid(solver):
+    grid_obj, solution, _ = generate_puzzle(5, seed=2)
+    cg = CompactGrid.from_grid(grid_obj)
+    solved, _, _ = solver(cg)
+    assert solved
+    assert cg.to_matrix() == solution
+
+def test_count_solutions_on_a_compact_grid():
+    grid_obj, solution, _ = generate_puzzle(5, seed=3)
+    assert count_solutions(CompactGrid.from_grid(grid_obj), collect=True) == (1, [solution])
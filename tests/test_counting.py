@@ -0,0 +1,39 @@
+import pytest
+
+from grid import KenKenGrid
+from backtracking import count_solutions
+from dlx import count_solutions_dlx
+from generator import generate_puzzle
+
+# Under-constrained grids: the two counters must agree exactly, not just on
+# "one or more than one".
+GRIDS = [
+    {'n': 4, 'cages': []},
+    {'n': 4, 'cages': ['0,0,0,1;+;3', '1,1,2,1;*;12']},
+    {'n': 5, 'cages': ['0,0,1,0;-;4', '0,1,0,2,1,1;+;12', '2,2;=;3', '4,3,4,4;/;2']},
+    {'n': 4, 'cages': ['0,0,1,0,2,0,3,0;+;10'], 'grid': [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2]]},
+]
+
+@pytest.mark.parametrize('data', GRIDS)
+def test_backtracking_and_dlx_counts_agree(data):
+    count, solutions = count_solutions(KenKenGrid.from_dict(data), limit=10 ** 6, collect=True)
+    dlx_count, dlx_solutions = count_solutions_dlx(KenKenGrid.from_dict(data), limit=10 ** 6, collect=True)
+    assert count == dlx_count > 1
+    assert sorted(solutions) == sorted(dlx_solutions)
+
+def test_empty_4x4_has_all_latin_squares():
+    assert count_solutions(KenKenGrid(4), limit=10 ** 6)[0] == 576
+    assert count_solutions_dlx(KenKenGrid(4), limit=10 ** 6)[0] == 576
+
+@pytest.mark.parametrize('counter', [count_solutions, count_solutions_dlx])
+def test_limit_stops_the_count(counter):
+    assert counter(KenKenGrid(4), limit=2)[0] == 2
+
+@pytest.mark.parametrize('n,seed', [(4, 0), (5, 1), (6, 2), (6, 3)])
+def test_generated_puzzles_have_exactly_their_solution(n, seed):
+    grid_obj, solution, rating = generate_puzzle(n, seed=seed)
+    assert grid_obj is not None
+    for counter in (count_solutions, count_solutions_dlx):
+        count, solutions = counter(grid_obj, limit=2, collect=True)
+        assert count == 1
+        assert solutions == [solution]
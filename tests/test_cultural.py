@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from generator import generate_puzzle
+from cultural import CulturalAlgorithm
+
+# The GA keeps per-individual duplicate/cage counts up to date incrementally;
+# every operator must leave them equal to a from-scratch recount.
+
+def assert_consistent(ca, ind):
+    ref = ca.as_individual([row[:] for row in ind])
+    assert ind.fit == ca.fitness(ind) == ref.fit
+    assert ind.dups == ref.dups
+    assert ind.bad == ref.bad
+
+@pytest.fixture(params=[4, 6])
+def puzzle(request):
+    grid_obj, solution, _ = generate_puzzle(request.param, seed=11)
+    return grid_obj, solution
+
+def test_solution_scores_zero(puzzle):
+    grid_obj, solution = puzzle
+    ca = CulturalAlgorithm(grid_obj, pop_size=20)
+    assert ca.as_individual(solution).fit == 0
+
+def test_operators_keep_incremental_fitness(puzzle):
+    grid_obj, solution = puzzle
+    random.seed(1)
+    ca = CulturalAlgorithm(grid_obj, pop_size=20)
+    pop = [ca.random_individual() for _ in range(20)] + [ca.as_individual(solution)]
+    for step in range(400):
+        a, b = random.sample(pop, 2)
+        child = ca.crossover(a, b)
+        ca.mutate_in_place(child, 0.5)
+        if step % 3 == 0:
+            ca.local_search(child, 5)
+        assert_consistent(ca, child)
+        # parents are never modified through the child
+        assert_consistent(ca, a)
+        assert_consistent(ca, b)
+        pop[random.randrange(len(pop))] = child
+        assert_consistent(ca, ca.mutate([list(row) for row in solution], 1.0))
+
+def test_mutate_population_keeps_incremental_fitness(puzzle):
+    grid_obj, solution = puzzle
+    random.seed(2)
+    ca = CulturalAlgorithm(grid_obj, pop_size=20)
+    pop = [ca.random_individual() for _ in range(30)]
+    for _ in range(20):
+        ca.mutate_population(pop, mutation_rate=0.5, resample_rate=0.2)
+        for ind in pop:
+            assert_consistent(ca, ind)